@@ -1,11 +1,17 @@
 import os
-import pandas as pd
 import numpy as np
 import streamlit as st
-import joblib
 from streamlit.components.v1 import html
 import random
 
+import metrics
+from aqi import pm25_to_aqi as pm25_aqi
+from features import build_features
+from forecast import HOUR, current_hour, recursive_forecast
+from loaders import MODEL_FILE, cache_stats, dataset_path, list_cities, load_dataset
+from prediction_cache import PredictionCache
+from registry import ModelRegistry
+
 ROAST_LINES = {
     "Good": [
         "Breathe all you want, the air won’t fight back.",
@@ -80,36 +86,64 @@ st.markdown(
 # --------------------------------------------------
 # SAFE LOADS
 # --------------------------------------------------
-if not os.path.exists("air_quality_dataset.csv"):
-    st.error("air_quality_dataset.csv not found. Run fetch_data.py first.")
-    st.stop()
+DATA_PATH = dataset_path()  # Parquet store if present, else the CSV
+# Stage latency histograms in the Prometheus text format; None to turn off
+METRICS_PORT = 9109  # http://localhost:9109/metrics
 
-if not os.path.exists("model.pkl"):
-    st.error("model.pkl not found. Run train_model.py first.")
+if not os.path.exists(DATA_PATH):
+    st.error(f"{DATA_PATH} not found. Run fetch_data.py first.")
     st.stop()
 
-df = pd.read_csv("air_quality_dataset.csv", parse_dates=["datetime"])
-df.set_index("datetime", inplace=True)
-df.dropna(inplace=True)
+if not os.path.exists(MODEL_FILE):
+    st.error(f"{MODEL_FILE} not found. Run train_model.py first.")
+    st.stop()
 
-model = joblib.load("model.pkl")
+@st.cache_resource
+def get_registry():
+    """Per-city models from models/ over the global model.pkl, shared by every session."""
+    return ModelRegistry(fallback=MODEL_FILE)
+
+@st.cache_resource
+def get_metrics_server():
+    """One /metrics endpoint per server process."""
+    return metrics.start_http_server(METRICS_PORT) if METRICS_PORT else None
+
+get_metrics_server()
+
+@st.cache_resource
+def get_prediction_cache():
+    """Predictions memoized on (model, feature row): reruns on unchanged data skip the model."""
+    return PredictionCache()
+
+# Multi-city datasets (fetch_data1.py --cities ...) carry a city column
+cities = list_cities(DATA_PATH)
+selected_city = None
+if cities:
+    selected_city = st.selectbox("City", cities, index=cities.index("Delhi") if "Delhi" in cities else 0)
+
+# The city's own model when one was trained (registry.py), else the global model
+with metrics.timed("model_load"):
+    model = get_registry().get(selected_city)
+
+# The page only needs the last 48 observed hours (up to the current UTC hour; the
+# saved Open-Meteo forecast rows after it are the forecast's exogenous inputs).
+# With the Parquet store nothing else is read. Both are cached for the whole
+# process; `df` is shared, never modify it in place
+city_filter = [selected_city] if selected_city else None
+with metrics.timed("dataset_load"):
+    df = load_dataset(DATA_PATH, cities=city_filter, end=current_hour(), last_hours=48)
+    if df.empty:
+        st.error(f"No observed hours in {DATA_PATH} yet. Run fetch_data.py first.")
+        st.stop()
+    origin = df.index.max()
+    exog = load_dataset(DATA_PATH, cities=city_filter, start=origin + HOUR, end=origin + 24 * HOUR)
 
 # --------------------------------------------------
 # AQI HELPERS
 # --------------------------------------------------
 def pm25_to_aqi(pm):
-    breakpoints = [
-        (0, 30, 0, 50),
-        (31, 60, 51, 100),
-        (61, 90, 101, 200),
-        (91, 120, 201, 300),
-        (121, 250, 301, 400),
-        (251, 350, 401, 500)
-    ]
-    for c_low, c_high, a_low, a_high in breakpoints:
-        if c_low <= pm <= c_high:
-            return round(((pm - c_low) / (c_high - c_low)) * (a_high - a_low) + a_low)
-    return 500
+    # Shared CPCB table (aqi.py); slightly negative model outputs count as clean air
+    return pm25_aqi(max(pm, 0.0))
 
 def aqi_label_and_color(aqi):
     if aqi <= 50: return "Good", "#2ecc71"
@@ -124,10 +158,15 @@ def aqi_label_and_color(aqi):
 # PREDICTION
 # --------------------------------------------------
 latest = df.tail(1)
-feature_cols = [c for c in df.columns if c != "pm25_next" and df[c].dtype.kind in "if"]
-sample = latest[feature_cols]
-
-pred_pm25 = float(model.predict(sample)[0])
+# Same feature pipeline as training; 48 hours cover every lag/rolling window.
+# Columns are picked by the model's own feature names, so older models trained
+# on the raw inputs only keep working.
+feature_cols = model.feature_names
+with metrics.timed("build_features"):
+    sample = build_features(df).tail(1)[feature_cols]
+
+with metrics.timed("predict"):
+    pred_pm25 = float(get_prediction_cache().predict(model, sample)[0])
 pred_aqi = pm25_to_aqi(pred_pm25)
 aqi_label, aqi_color = aqi_label_and_color(pred_aqi)
 
@@ -245,6 +284,12 @@ if len(df) > 1:
 else:
     st.info("Not enough data available yet.")
 
+st.subheader("PM2.5 Forecast (Next 24 Hours)")
+with metrics.timed("forecast_24h"):
+    # From the latest observed hour, with the saved Open-Meteo forecast rows as exogenous inputs
+    horizon_df = recursive_forecast(model, df, exog, horizon=24)
+st.line_chart(horizon_df.set_index("datetime")["pm25"])
+
 # --------------------------------------------------
 # OUTDOOR TASK PLANNER
 # --------------------------------------------------
@@ -296,6 +341,9 @@ st.markdown(
     unsafe_allow_html=True
 )
 
+with st.expander("Cache stats"):
+    st.json({**cache_stats(), "models": get_registry().stats(), "predictions": get_prediction_cache().stats()})
+
 
 
 
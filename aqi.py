@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+
+# --- AQI Breakpoints (Indian CPCB PM2.5 standard) ---
+# (C_low, C_high, I_low, I_high, Category). Each band covers (C_low, C_high],
+# with C_low equal to the previous band's C_high, so fractional readings such
+# as 30.5 fall into a band instead of between two of them.
+PM25_BREAKPOINTS = [
+    (0.0, 30.0, 0, 50, "Good"),
+    (30.0, 60.0, 51, 100, "Satisfactory"),
+    (60.0, 90.0, 101, 200, "Moderately Polluted"),
+    (90.0, 120.0, 201, 300, "Poor"),
+    (120.0, 250.0, 301, 400, "Very Poor"),
+    (250.0, 380.0, 401, 500, "Severe"),
+]
+
+CATEGORIES = tuple(bp[4] for bp in PM25_BREAKPOINTS)
+PM25_MAX = PM25_BREAKPOINTS[-1][1]  # Concentrations above this are capped at AQI 500
+INVALID = -1  # Category code for missing or negative concentrations
+
+_C_LOW = np.array([bp[0] for bp in PM25_BREAKPOINTS])
+_C_HIGH = np.array([bp[1] for bp in PM25_BREAKPOINTS])
+_I_LOW = np.array([bp[2] for bp in PM25_BREAKPOINTS], dtype=np.float64)
+_SLOPE = np.array([(bp[3] - bp[2]) / (bp[1] - bp[0]) for bp in PM25_BREAKPOINTS])
+
+
+def pm25_to_aqi(pm25):
+    """Scalar PM2.5 (ug/m3) -> AQI. Returns None for missing or negative values."""
+    if pm25 is None or pd.isna(pm25) or pm25 < 0:
+        return None
+    for c_low, c_high, i_low, i_high, _ in PM25_BREAKPOINTS:
+        if pm25 <= c_high:
+            return round(i_low + (pm25 - c_low) * (i_high - i_low) / (c_high - c_low))
+    return 500
+
+
+def pm25_to_aqi_array(pm25):
+    """Vectorized PM2.5 -> (AQI, category code) for a whole array or Series.
+
+    AQI values are rounded floats with NaN for missing/negative input. Category
+    codes index into CATEGORIES, with INVALID (-1) for missing/negative input.
+    A Series input gives Series outputs on the same index.
+    """
+    c = np.asarray(pm25, dtype=np.float64)
+    band = np.searchsorted(_C_HIGH, c, side="left")
+    over = band >= len(_C_HIGH)
+    band = np.minimum(band, len(_C_HIGH) - 1)
+
+    aqi = _I_LOW[band] + (c - _C_LOW[band]) * _SLOPE[band]
+    aqi = np.rint(np.where(over, 500.0, aqi))
+
+    invalid = ~(c >= 0)  # also catches NaN
+    aqi = np.where(invalid, np.nan, aqi)
+    codes = np.where(invalid, INVALID, band).astype(np.int8)
+
+    if isinstance(pm25, pd.Series):
+        return pd.Series(aqi, index=pm25.index, name="aqi"), pd.Series(codes, index=pm25.index, name="aqi_category")
+    return aqi, codes
+
+
+def category_names(codes):
+    """Maps category codes to names ("N/A" for INVALID)."""
+    names = np.array(CATEGORIES + ("N/A",), dtype=object)
+    return names[np.asarray(codes)]  # INVALID (-1) picks the trailing "N/A"
@@ -0,0 +1,152 @@
+"""Resumable historical backfill into the Parquet store.
+
+The date range is split into work units of --unit-days per city. Units are
+fetched concurrently (per-host rate limited, like fetch_data1.py --cities)
+and each one is upserted into the store as soon as it arrives. Finished
+units are recorded in a JSON state file, so re-running the same command
+after a crash or Ctrl-C only fetches what is missing; failed units are
+retried on the next run.
+
+    python backfill.py --cities Delhi Mumbai --start 2024-01-01 --end 2024-12-31
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+import metrics
+import store
+from fetch_data1 import CITY, ENDPOINTS, endpoints_for, fetch_city, read_city_list
+from geocode_cache import GeocodeCache
+from http_client import HostRateLimiter, make_session
+
+STATE_FILE = "backfill_state.json"
+UNIT_DAYS = 30
+ARCHIVE_URL = "https://archive-api.open-meteo.com/v1/archive"  # weather older than the forecast API keeps
+
+
+def work_units(cities, start, end, unit_days=UNIT_DAYS):
+    """(city, first day, last day) for every --unit-days slice of [start, end], inclusive."""
+    start, end = pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+    units = []
+    for city in cities:
+        day = start
+        while day <= end:
+            last = min(day + pd.Timedelta(days=unit_days - 1), end)
+            units.append((city, day.date(), last.date()))
+            day = last + pd.Timedelta(days=1)
+    return units
+
+
+def unit_id(unit):
+    city, first, last = unit
+    return f"{city}|{first}|{last}"
+
+
+class Checkpoint:
+    """Work units already in the store (and the last error of failed ones), kept in a JSON file.
+
+    The file is rewritten atomically after every unit, so a crash leaves
+    either the old or the new state, never a truncated file.
+    """
+
+    def __init__(self, path=STATE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self.done = {}
+        self.failed = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                state = json.load(f)
+            self.done = state.get("done", {})
+            self.failed = state.get("failed", {})
+
+    def _save(self):
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"done": self.done, "failed": self.failed}, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.path)
+
+    def mark_done(self, uid, rows):
+        with self._lock:
+            self.done[uid] = {"rows": rows, "at": pd.Timestamp.now("UTC").isoformat(timespec="seconds")}
+            self.failed.pop(uid, None)
+            self._save()
+
+    def mark_failed(self, uid, error):
+        with self._lock:
+            self.failed[uid] = str(error)
+            self._save()
+
+
+def backfill(cities, start, end, root=store.STORE_DIR, state_path=STATE_FILE, unit_days=UNIT_DAYS,
+             workers=4, rate=5, endpoints=ENDPOINTS, cache=None):
+    """Fetches every unit not yet done into the store; returns (units done now, units failed)."""
+    checkpoint = Checkpoint(state_path)
+    units = [u for u in work_units(cities, start, end, unit_days) if unit_id(u) not in checkpoint.done]
+    total = len(units)
+    print(f"{total} units to fetch ({len(checkpoint.done)} already done)")
+
+    session = make_session(pool_size=workers)
+    limiter = HostRateLimiter(rate)
+    write_lock = threading.Lock()  # units of one city can share a (city, month) partition
+
+    def run(unit):
+        city, first, last = unit
+        df = fetch_city(city, session, limiter, endpoints, cache, first, last)
+        df = df[(df.index >= pd.Timestamp(first)) & (df.index < pd.Timestamp(last) + pd.Timedelta(days=1))]
+        if len(df):
+            with write_lock, metrics.timed("store_write"):
+                store.write(df.assign(city=city), root)
+        return len(df)
+
+    done = failed = 0
+    with session, ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(run, unit): unit for unit in units}
+        for future in as_completed(futures):
+            uid = unit_id(futures[future])
+            try:
+                rows = future.result()
+            except Exception as e:
+                checkpoint.mark_failed(uid, e)
+                failed += 1
+                print(f"[{done + failed}/{total}] {uid} failed: {e}")
+                continue
+            checkpoint.mark_done(uid, rows)
+            done += 1
+            print(f"[{done + failed}/{total}] {uid}: {rows} rows")
+    return done, failed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Resumable historical backfill into the Parquet store")
+    parser.add_argument("--cities", nargs="+")
+    parser.add_argument("--cities-file", help="Text file with one city per line")
+    parser.add_argument("--start", required=True, help="First day, e.g. 2024-01-01")
+    parser.add_argument("--end", default=None, help="Last day (default: yesterday)")
+    parser.add_argument("--unit-days", type=int, default=UNIT_DAYS, help="Days per city fetched as one unit")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent units")
+    parser.add_argument("--rate", type=float, default=5, help="Max requests per second per host")
+    parser.add_argument("--store", default=store.STORE_DIR)
+    parser.add_argument("--state", default=STATE_FILE, help="Checkpoint file; delete it to start over")
+    parser.add_argument("--archive", action="store_true",
+                        help="Take weather from Open-Meteo's archive API (needed a few months back and more)")
+    parser.add_argument("--base-url", help="Send every request to this server instead (e.g. a local stub)")
+    args = parser.parse_args()
+
+    cities = (args.cities or []) + (read_city_list(args.cities_file) if args.cities_file else [])
+    end = args.end or (pd.Timestamp.now("UTC").normalize() - pd.Timedelta(days=1)).date()
+    endpoints = endpoints_for(args.base_url) if args.base_url else dict(ENDPOINTS)
+    if args.archive and not args.base_url:
+        endpoints["weather"] = ARCHIVE_URL
+
+    start = time.perf_counter()
+    done, failed = backfill(cities or [CITY], args.start, end, args.store, args.state, args.unit_days,
+                            args.workers, args.rate, endpoints, GeocodeCache())
+    print(f"{done} units written to {args.store} in {time.perf_counter() - start:.1f} s, {failed} failed"
+          + (" (run again to retry them)" if failed else ""))
+    raise SystemExit(1 if failed else 0)
@@ -0,0 +1,186 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from xgboost import XGBRegressor
+
+from aqi import pm25_to_aqi_array
+from features import LAGS, WINDOWS, build_features, feature_columns, next_hour
+from loaders import dataset_path, file_key, load_dataset, load_params
+from schema import epoch_hours
+
+CACHE_DIR = ".backtest_cache"
+REPORT_FILE = "backtest_report.csv"
+DEFAULT_PARAMS = {"n_estimators": 400, "learning_rate": 0.05, "max_depth": 10}  # train_model.py before tuning
+
+
+# --- Fold datasets ---
+def _timestamp(hour):
+    return pd.Timestamp(np.datetime64(int(hour), "h"))
+
+
+def prepare(data_path=None, cache_dir=CACHE_DIR):
+    """Builds the feature matrix once and caches it as .npy files; returns the cache directory.
+
+    Features only look backwards in time, so one matrix serves every fold
+    (each fold just selects rows by hour). The cache is keyed on the
+    dataset version and the pipeline settings, so re-running a backtest
+    after a model change skips the feature work entirely.
+    """
+    data_path = data_path or dataset_path()
+    key = json.dumps([os.path.abspath(data_path), file_key(data_path), list(LAGS), list(WINDOWS)])
+    path = os.path.join(cache_dir, hashlib.sha1(key.encode()).hexdigest()[:16])
+    if os.path.exists(os.path.join(path, "meta.json")):
+        return path
+
+    df = build_features(load_dataset(data_path))
+    df["pm25_next"] = next_hour(df)
+    df = df.dropna(subset=["pm25_next"])
+    columns = feature_columns(df.columns)
+    cities = df["city"].to_numpy() if "city" in df.columns else np.full(len(df), "", dtype=object)
+    names, codes = np.unique(cities, return_inverse=True)
+
+    os.makedirs(path, exist_ok=True)
+    np.save(os.path.join(path, "X.npy"), df[columns].to_numpy(dtype=np.float32))
+    np.save(os.path.join(path, "y.npy"), df["pm25_next"].to_numpy(dtype=np.float32))
+    np.save(os.path.join(path, "hours.npy"), epoch_hours(df.index))
+    np.save(os.path.join(path, "city.npy"), codes.astype(np.int32))
+    # meta.json last: its presence marks a complete cache entry
+    with open(os.path.join(path, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"data_path": data_path, "features": columns, "cities": [str(c) for c in names]}, f)
+    return path
+
+
+def load_prepared(path):
+    """(X, y, hours, city codes, meta) from prepare(), memory-mapped so worker processes share pages."""
+    with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+    arrays = [np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in ("X", "y", "hours", "city")]
+    return (*arrays, meta)
+
+
+def walk_forward_splits(hours, folds=5, test_hours=24 * 7, train_hours=None):
+    """Expanding-window folds over the hours present in the data.
+
+    The last `folds` blocks of `test_hours` hours are the test periods; each
+    fold trains on everything before its block (or only the last
+    `train_hours` hours, for a sliding window). Returns
+    [(train_start, test_start, test_end), ...] as epoch hours, test_end exclusive.
+    """
+    last = int(np.max(hours)) + 1
+    first = int(np.min(hours))
+    splits = []
+    for i in range(folds, 0, -1):
+        test_start = last - i * test_hours
+        if test_start <= first:
+            continue
+        train_start = first if train_hours is None else max(first, test_start - train_hours)
+        splits.append((train_start, test_start, test_start + test_hours))
+    if not splits:
+        raise ValueError(f"not enough history for a {test_hours}-hour test period")
+    return splits
+
+
+# --- Folds ---
+def _metrics(y, pred):
+    err = pred - y
+    actual = pm25_to_aqi_array(np.maximum(y, 0.0))[1]
+    predicted = pm25_to_aqi_array(np.maximum(pred, 0.0))[1]
+    return {
+        "mae": float(np.mean(np.abs(err))),
+        "rmse": float(np.sqrt(np.mean(err ** 2))),
+        "category_accuracy": float(np.mean(actual == predicted)),
+    }
+
+
+def run_fold(path, fold, split, params, nthread=1):
+    """Trains on one fold and returns report rows for all cities and for each city."""
+    X, y, hours, city, meta = load_prepared(path)
+    train_start, test_start, test_end = split
+    train = (hours >= train_start) & (hours < test_start)
+    test = (hours >= test_start) & (hours < test_end)
+
+    t0 = time.perf_counter()
+    model = XGBRegressor(**params, n_jobs=nthread)
+    model.fit(X[train], y[train])
+    pred = model.predict(X[test])
+    seconds = time.perf_counter() - t0
+
+    base = {
+        "fold": fold,
+        "train_start": _timestamp(train_start),
+        "test_start": _timestamp(test_start),
+        "test_end": _timestamp(test_end),
+        "n_train": int(train.sum()),
+        "seconds": round(seconds, 2),
+    }
+    y_test, city_test = np.asarray(y[test]), np.asarray(city[test])
+    rows = [{**base, "city": "ALL", "n_test": len(y_test), **_metrics(y_test, pred)}]
+    for code in np.unique(city_test):
+        sel = city_test == code
+        rows.append({**base, "city": meta["cities"][code] or "ALL", "n_test": int(sel.sum()), **_metrics(y_test[sel], pred[sel])})
+    # A single-city dataset has no city column: its one city is the ALL row
+    return rows if len(meta["cities"]) > 1 else rows[:1]
+
+
+def _run_fold(args):
+    return run_fold(*args)
+
+
+def backtest(data_path=None, folds=5, test_hours=24 * 7, train_hours=None, params=None,
+             workers=None, cache_dir=CACHE_DIR):
+    """Runs every fold, in parallel across cores; returns the report table.
+
+    The model uses the params saved by tune.py (if any), overridden by `params`.
+
+    Folds are spread over `workers` processes and each XGBoost fit gets an
+    equal share of the cores, so a 5-fold run on 8 cores uses all 8 without
+    oversubscribing.
+    """
+    params = {**load_params(DEFAULT_PARAMS), **(params or {})}
+    path = prepare(data_path, cache_dir)
+    _, _, hours, _, _ = load_prepared(path)
+    splits = walk_forward_splits(hours, folds, test_hours, train_hours)
+
+    cores = os.cpu_count() or 1
+    workers = min(workers or cores, len(splits))
+    nthread = max(1, cores // workers)
+    tasks = [(path, i, split, params, nthread) for i, split in enumerate(splits)]
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_run_fold, tasks))
+    else:
+        results = [_run_fold(task) for task in tasks]
+
+    report = pd.DataFrame([row for rows in results for row in rows])
+    columns = ["fold", "city", "train_start", "test_start", "test_end", "n_train", "n_test",
+               "mae", "rmse", "category_accuracy", "seconds"]
+    return report[columns]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Walk-forward backtest of the next-hour PM2.5 model")
+    parser.add_argument("--data", default=None, help="CSV file or Parquet store (default: the store if present, else the CSV)")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--test-hours", type=int, default=24 * 7, help="Length of each test period")
+    parser.add_argument("--train-hours", type=int, default=None, help="Sliding training window (default: expanding)")
+    parser.add_argument("--params", default=None, help='XGBoost parameters as JSON, e.g. \'{"max_depth": 6}\'')
+    parser.add_argument("--workers", type=int, default=None, help="Parallel folds (default: one per core)")
+    parser.add_argument("--out", default=REPORT_FILE)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    report = backtest(args.data, args.folds, args.test_hours, args.train_hours,
+                      json.loads(args.params) if args.params else None, args.workers)
+    report.to_csv(args.out, index=False)
+
+    print(report.to_string(index=False, float_format=lambda v: f"{v:.3f}"))
+    summary = report.groupby("city")[["mae", "rmse", "category_accuracy"]].mean()
+    print("\nMean over folds:")
+    print(summary.to_string(float_format=lambda v: f"{v:.3f}"))
+    print(f"\n{len(report['fold'].unique())} folds in {time.perf_counter() - start:.1f} s -> {args.out}")
@@ -0,0 +1,149 @@
+import argparse
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import store
+from aqi import category_names, pm25_to_aqi_array
+from features import MAX_LAG, RAW_COLUMNS, build_features
+from loaders import MODEL_FILE, as_booster, dataset_path, load_model
+
+CHUNK_SIZE = 100_000
+
+_booster = None  # per-process model, set by _init_worker or main
+
+
+def _init_worker(model_path):
+    """Loads the model once per worker process, single-threaded so workers don't oversubscribe cores."""
+    global _booster
+    _booster = as_booster(load_model(model_path))
+    _booster.set_param({"nthread": 1})
+
+
+def _build(df, context):
+    """Pipeline features for a flat chunk, with `context` rows only used as history."""
+    frame = df.assign(_context=False)
+    if context is not None:
+        frame = pd.concat([context.assign(_context=True), frame], ignore_index=True)
+    built = build_features(frame.set_index("datetime"))
+    return built[~built["_context"]].drop(columns="_context").reset_index()
+
+
+def score_chunk(df, context=None):
+    """Adds pm25_pred, aqi and aqi_category columns to one chunk with a single predict call.
+
+    Models trained on the features.py pipeline get their features built here;
+    `context` holds the preceding hours so lags at the start of the chunk
+    are not cut off. Those chunks come back sorted by (city, datetime).
+    """
+    if not set(_booster.feature_names) <= set(df.columns):
+        df = _build(df, context)
+    X = df[_booster.feature_names].to_numpy(dtype=np.float32)
+    pred = _booster.inplace_predict(X)
+    aqi, codes = pm25_to_aqi_array(np.maximum(pred, 0.0))
+    return df.assign(pm25_pred=pred, aqi=aqi, aqi_category=category_names(codes))
+
+
+def iter_chunks(path, chunk_size=CHUNK_SIZE):
+    """Streams the CSV or the Parquet store in chunks of at most `chunk_size` rows."""
+    if os.path.isdir(path):
+        yield from store.iter_batches(path, batch_size=chunk_size)
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_size, parse_dates=["datetime"])
+
+
+def _score(item):
+    return score_chunk(*item)
+
+
+def with_context(chunks):
+    """Pairs every chunk with the last MAX_LAG hours (per city) that came before it."""
+    context = None
+    for chunk in chunks:
+        yield chunk, context
+        recent = chunk if context is None else pd.concat([context, chunk], ignore_index=True)
+        if "city" in recent.columns:
+            newest = recent.groupby("city")["datetime"].transform("max")
+        else:
+            newest = recent["datetime"].max()
+        context = recent[recent["datetime"] > newest - pd.Timedelta(hours=MAX_LAG + 1)]
+
+
+class _Writer:
+    """Appends scored chunks to a CSV, or to a Parquet file when `path` ends in .parquet."""
+
+    def __init__(self, path):
+        self.path = path
+        self._parquet = None
+        self._first = True
+
+    def write(self, df):
+        if self.path.endswith(".parquet"):
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.path, table.schema)
+            self._parquet.write_table(table.cast(self._parquet.schema))
+        else:
+            df.to_csv(self.path, mode="w" if self._first else "a", header=self._first, index=False)
+        self._first = False
+
+    def close(self):
+        if self._parquet is not None:
+            self._parquet.close()
+
+
+def run(data_path, out_path, model_path=MODEL_FILE, chunk_size=CHUNK_SIZE, workers=0):
+    """Scores every row of the dataset and writes the result; returns (rows, seconds)."""
+    global _booster
+    start = time.perf_counter()
+    writer = _Writer(out_path)
+    rows = 0
+    _booster = as_booster(load_model(model_path))
+    chunks = iter_chunks(data_path, chunk_size)
+    if set(_booster.feature_names) <= set(RAW_COLUMNS):
+        chunks = ((chunk, None) for chunk in chunks)
+    else:
+        chunks = with_context(chunks)
+    try:
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(model_path,)) as pool:
+                # At most 2 chunks per worker are read ahead (map() would read them all up front);
+                # results are written in submission order, so the output matches the dataset
+                pending = deque()
+                for item in chunks:
+                    pending.append(pool.submit(_score, item))
+                    if len(pending) >= 2 * workers:
+                        scored = pending.popleft().result()
+                        writer.write(scored)
+                        rows += len(scored)
+                while pending:
+                    scored = pending.popleft().result()
+                    writer.write(scored)
+                    rows += len(scored)
+        else:
+            for item in chunks:
+                scored = _score(item)
+                writer.write(scored)
+                rows += len(scored)
+    finally:
+        writer.close()
+    return rows, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score every (city, hour) row of a dataset with model.pkl")
+    parser.add_argument("--data", default=None, help="CSV file or Parquet store (default: the store if present, else the CSV)")
+    parser.add_argument("--out", default="predictions.csv", help="Output .csv or .parquet")
+    parser.add_argument("--model", default=MODEL_FILE)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=0, help="Score chunks in this many processes (0 = in-process)")
+    args = parser.parse_args()
+
+    rows, seconds = run(args.data or dataset_path(), args.out, args.model, args.chunk_size, args.workers)
+    print(f"Scored {rows:,} rows in {seconds:.2f} s ({rows / seconds:,.0f} rows/s) -> {args.out}")
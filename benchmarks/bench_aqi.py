@@ -0,0 +1,39 @@
+"""Scalar vs vectorized PM2.5 -> AQI conversion.
+
+Run from the repo root:  python -m benchmarks.bench_aqi --rows 1000000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from aqi import pm25_to_aqi, pm25_to_aqi_array
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    # Hourly PM2.5 in Indian cities is right-skewed; a gamma draw covers every band
+    pm25 = np.random.default_rng(args.seed).gamma(2.0, 60.0, args.rows)
+
+    t0 = time.perf_counter()
+    scalar = np.array([pm25_to_aqi(v) for v in pm25], dtype=np.float64)
+    t_scalar = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    vector, _ = pm25_to_aqi_array(pm25)
+    t_vector = time.perf_counter() - t0
+
+    assert np.array_equal(scalar, vector), "scalar and vectorized AQI disagree"
+
+    print(f"rows:       {args.rows:,}")
+    print(f"scalar:     {t_scalar:.3f} s  ({args.rows / t_scalar:,.0f} rows/s)")
+    print(f"vectorized: {t_vector:.3f} s  ({args.rows / t_vector:,.0f} rows/s)")
+    print(f"speed-up:   {t_scalar / t_vector:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
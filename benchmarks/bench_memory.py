@@ -0,0 +1,55 @@
+"""Memory of the in-memory dataset: default pandas dtypes vs schema.py's compact ones.
+
+Loads a synthetic month of hourly data for many cities both ways and prints
+the size per column. Run from the repo root:
+
+    python -m benchmarks.bench_memory --cities 100 --hours 720
+"""
+import argparse
+import os
+import tempfile
+
+import pandas as pd
+
+from benchmarks.synthetic import make_dataset
+from loaders import load_dataset
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cities", type=int, default=100)
+    parser.add_argument("--hours", type=int, default=24 * 30)
+    parser.add_argument("--sessions", type=int, default=10, help="Streamlit sessions asking for the dataset")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "dataset.csv")
+        make_dataset(args.cities, args.hours, args.seed).to_csv(path, index=False)
+
+        # What load_dataset() returned before schema.py
+        before = pd.read_csv(path, parse_dates=["datetime"]).set_index("datetime")
+        frames = [load_dataset(path) for _ in range(args.sessions)]
+        after = frames[0]
+
+    assert all(f is after for f in frames), "sessions should share one frame"
+    pd.testing.assert_frame_equal(before, after, check_dtype=False, check_categorical=False, atol=1e-3)
+
+    old = before.memory_usage(deep=True)
+    new = after.memory_usage(deep=True)
+    table = pd.DataFrame({
+        "before": before.dtypes.astype(str),
+        "after": after.dtypes.astype(str),
+        "before_kb": old / 1024,
+        "after_kb": new / 1024,
+    })
+    table.loc["Index", ["before", "after"]] = str(before.index.dtype), str(after.index.dtype)
+    print(f"{len(after):,} rows ({args.cities} cities x {args.hours} h)\n")
+    print(table.to_string(float_format=lambda v: f"{v:,.0f}"))
+    print(f"\ntotal: {old.sum() / 2**20:.1f} MB -> {new.sum() / 2**20:.1f} MB "
+          f"({1 - new.sum() / old.sum():.0%} less)")
+    print(f"{args.sessions} sessions got the same cached frame: {new.sum() / 2**20:.1f} MB in total")
+
+
+if __name__ == "__main__":
+    main()
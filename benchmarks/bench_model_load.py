@@ -0,0 +1,69 @@
+"""Cold-start cost of model.pkl (joblib + XGBRegressor) vs model.ubj (bare Booster).
+
+Each path runs in a fresh interpreter. "import" is the module imports (xgboost
+itself pulls in sklearn via xgboost.compat either way), "load" is reading the
+model file into a usable object. The booster path loads the file with xgboost
+alone, as loaders.read_booster() does, without importing loaders (which pulls
+in pandas, pyarrow and the store) into the measurement.
+Run from the repo root:  python -m benchmarks.bench_model_load --repeat 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PICKLE = """
+import time; t0 = time.perf_counter()
+import joblib, xgboost
+t1 = time.perf_counter()
+model = joblib.load({path!r})
+t2 = time.perf_counter()
+"""
+
+BOOSTER = """
+import time; t0 = time.perf_counter()
+import json, xgboost
+t1 = time.perf_counter()
+model = xgboost.Booster()
+model.load_model({path!r})
+with open({meta!r}, encoding="utf-8") as f:
+    model.feature_names = json.load(f)["feature_names"]
+t2 = time.perf_counter()
+"""
+
+REPORT = """
+import json
+print(json.dumps({"import": t1 - t0, "load": t2 - t1, "total": t2 - t0}))
+"""
+
+
+def cold_start(template, path):
+    meta = os.path.splitext(path)[0] + ".meta.json"  # loaders.booster_meta_path()
+    code = "import warnings; warnings.filterwarnings('ignore')\n" + template.format(path=path, meta=meta) + REPORT
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pickle", default="model.pkl")
+    parser.add_argument("--booster", default="model.ubj")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.booster):
+        from loaders import load_model, save_booster
+        save_booster(load_model(args.pickle), args.booster)
+        print(f"Exported {args.pickle} -> {args.booster}")
+
+    for name, template, path in [("pickle", PICKLE, args.pickle), ("booster", BOOSTER, args.booster)]:
+        runs = [cold_start(template, path) for _ in range(args.repeat)]
+        median = {k: statistics.median(r[k] for r in runs) * 1000 for k in runs[0]}
+        print(f"{name:8s} ({os.path.getsize(path) / 1024:,.0f} KB): "
+              f"import {median['import']:7.1f} ms  load {median['load']:7.1f} ms  total {median['total']:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Load test for serve.py.
+
+Start the service (python serve.py) and run from the repo root:
+    python -m benchmarks.load_test --concurrency 32 --requests 2000
+or let the script start it in-process with --spawn.
+"""
+import argparse
+import http.client
+import json
+import threading
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+
+def worker(host, port, paths, latencies, errors):
+    conn = http.client.HTTPConnection(host, port, timeout=30)  # one keep-alive connection per client
+    for path in paths:
+        t0 = time.perf_counter()
+        try:
+            conn.request("GET", path)
+            resp = conn.getresponse()
+            resp.read()
+            if resp.status != 200:
+                errors.append(resp.status)
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(str(e))
+            conn.close()
+            conn = http.client.HTTPConnection(host, port, timeout=30)
+        latencies.append(time.perf_counter() - t0)
+    conn.close()
+
+
+def get_json(host, port, path):
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    conn.request("GET", path)
+    return json.loads(conn.getresponse().read())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--path", default="/predict?city=Delhi", help="e.g. /forecast?city=Delhi&hours=24")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--spawn", action="store_true", help="Start serve.py's server in this process first")
+    args = parser.parse_args()
+
+    url = urlsplit(args.url)
+    host, port = url.hostname, url.port or 80
+    if args.spawn:
+        from serve import make_server
+        server = make_server(host, port)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    before = get_json(host, port, "/health")
+    per_client = [args.requests // args.concurrency + (i < args.requests % args.concurrency) for i in range(args.concurrency)]
+    latencies, errors = [], []
+    threads = [
+        threading.Thread(target=worker, args=(host, port, [args.path] * n, latencies, errors))
+        for n in per_client
+    ]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    after = get_json(host, port, "/health")
+
+    ms = np.array(latencies) * 1000
+    kind = "forecast" if args.path.startswith("/forecast") else "predict"
+    batches = after[f"{kind}_batches"] - before[f"{kind}_batches"]
+    served = after[f"{kind}_requests"] - before[f"{kind}_requests"]
+    print(f"requests:    {len(ms):,} ({len(errors)} errors) with {args.concurrency} clients")
+    print(f"throughput:  {len(ms) / elapsed:,.0f} req/s")
+    print(f"latency ms:  p50 {np.percentile(ms, 50):.1f}  p95 {np.percentile(ms, 95):.1f}  p99 {np.percentile(ms, 99):.1f}")
+    if batches:
+        print(f"batching:    {served:,} requests in {batches:,} predict calls ({served / batches:.1f} per call)")
+
+
+if __name__ == "__main__":
+    main()
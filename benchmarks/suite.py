@@ -0,0 +1,258 @@
+"""Benchmark suite: ingest, features, inference, AQI and a headless page render.
+
+Every case runs on synthetic data (benchmarks/synthetic.py), so runs are
+reproducible and can be scaled far past the real dataset. Results go to a
+JSON file; pass an earlier one with --compare to see the change per case.
+Run from the repo root:
+
+    python -m benchmarks.suite --cities 200 --hours 8760 --out bench.json
+    python -m benchmarks.suite --compare bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+
+import numpy as np
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO)
+
+import loaders  # noqa: E402
+import store  # noqa: E402
+from aqi import pm25_to_aqi_array  # noqa: E402
+from benchmarks.synthetic import make_dataset, make_responses  # noqa: E402
+from features import build_features  # noqa: E402
+from fetch_data1 import AQ_COLUMNS, WEATHER_COLUMNS, hourly_frame, to_frame  # noqa: E402
+from hourly_json import CHUNK_SIZE, parse_hourly  # noqa: E402
+
+CASES = ["csv_load", "parquet_load", "to_frame", "build_features", "predict", "aqi", "render"]
+BATCH_SIZES = (1, 64, 1024, 16384, 262144)
+
+
+def measure(fn, repeat, setup=None):
+    """Seconds per call of fn() over `repeat` runs, after one warm-up run."""
+    times = []
+    for i in range(repeat + 1):
+        if setup is not None:
+            setup()
+        t0 = time.perf_counter()
+        fn()
+        if i:
+            times.append(time.perf_counter() - t0)
+    return times
+
+
+def result(name, times, rows=None, **params):
+    median = statistics.median(times)
+    out = {"case": name, **params, "repeat": len(times), "median_s": median, "min_s": min(times)}
+    if rows:
+        out.update(rows=rows, rows_per_s=rows / median)
+    return out
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    import pandas
+    import xgboost
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "pandas": pandas.__version__,
+        "numpy": np.__version__,
+        "xgboost": xgboost.__version__,
+        "cpus": os.cpu_count(),
+        "platform": platform.platform(),
+    }
+
+
+# --- Cases ---
+def bench_csv_load(ctx, repeat):
+    # Cleared every run: measures parsing, not loaders' in-memory cache
+    times = measure(lambda: loaders.load_dataset(ctx["csv"]), repeat, setup=loaders.clear_caches)
+    return [result("csv_load", times, ctx["rows"])]
+
+
+def bench_parquet_load(ctx, repeat):
+    rows = []
+    times = measure(lambda: loaders.load_dataset(ctx["store"]), repeat, setup=loaders.clear_caches)
+    rows.append(result("parquet_load", times, ctx["rows"], query="all"))
+    times = measure(lambda: loaders.load_dataset(ctx["store"], cities=["Delhi"], last_hours=48),
+                    repeat, setup=loaders.clear_caches)
+    rows.append(result("parquet_load", times, 48, query="one city, last 48 h"))
+    return rows
+
+
+def bench_to_frame(ctx, repeat):
+    """Response bodies -> one city's frame: json.loads + to_frame vs the streaming parser."""
+    bodies = [json.dumps(r).encode() for r in make_responses(ctx["hours"], ctx["seed"])]
+
+    def chunks(body):
+        return (body[i:i + CHUNK_SIZE] for i in range(0, len(body), CHUNK_SIZE))
+
+    def streamed():
+        aq = parse_hourly(chunks(bodies[0]), AQ_COLUMNS)
+        weather = parse_hourly(chunks(bodies[1]), WEATHER_COLUMNS)
+        return hourly_frame(aq, weather)
+
+    return [
+        result("to_frame", measure(lambda: to_frame(*map(json.loads, bodies)), repeat), ctx["hours"], path="json"),
+        result("to_frame", measure(streamed, repeat), ctx["hours"], path="stream"),
+    ]
+
+
+def bench_build_features(ctx, repeat):
+    times = measure(lambda: build_features(ctx["df"]), repeat)
+    return [result("build_features", times, ctx["rows"])]
+
+
+def bench_predict(ctx, repeat):
+    model = ctx["model"]
+    X = build_features(ctx["df"])[model.feature_names].to_numpy(dtype=np.float32)
+    rows = []
+    for size in BATCH_SIZES:
+        if size > len(X):
+            break
+        batch = np.ascontiguousarray(X[:size])
+        calls = max(1, 4096 // size)  # enough calls per run that tiny batches are measurable
+        times = measure(lambda: [model.inplace_predict(batch) for _ in range(calls)], repeat)
+        rows.append(result("predict", [t / calls for t in times], size, batch_size=size))
+    return rows
+
+
+def bench_aqi(ctx, repeat):
+    pm25 = ctx["df"]["pm25"].to_numpy()
+    times = measure(lambda: pm25_to_aqi_array(pm25), repeat)
+    return [result("aqi", times, len(pm25))]
+
+
+def bench_render(ctx, repeat):
+    """app.py through Streamlit's AppTest, in a directory holding the synthetic CSV.
+
+    The first run pays for reading the dataset and loading the model; the
+    others hit the process-wide caches, like reruns on a live server.
+    """
+    from streamlit.testing.v1 import AppTest
+
+    cwd = os.getcwd()
+    os.chdir(ctx["dir"])
+    try:
+        loaders.clear_caches()
+        times = []
+        for _ in range(repeat + 1):
+            at = AppTest.from_file(os.path.join(REPO, "app.py"), default_timeout=300)
+            t0 = time.perf_counter()
+            at.run()
+            times.append(time.perf_counter() - t0)
+            if at.exception:
+                raise RuntimeError(f"app.py failed: {at.exception[0].value}")
+    finally:
+        os.chdir(cwd)
+    return [result("render", times[:1], cache="cold"), result("render", times[1:], cache="warm")]
+
+
+# --- Setup ---
+def prepare(cities, hours, seed, tmp):
+    """Writes the synthetic dataset as a CSV and a Parquet store, plus a model matching its features."""
+    df = make_dataset(cities, hours, seed)
+    csv = os.path.join(tmp, loaders.DATASET_FILE)
+    df.to_csv(csv, index=False)
+    store.write(df, os.path.join(tmp, "store"))
+
+    # The repo's model when present (what the pages serve), else a small one
+    # fitted on the synthetic data so the suite runs from a fresh checkout
+    model_path = os.path.join(REPO, loaders.BOOSTER_FILE)
+    if os.path.exists(model_path):
+        model = loaders.read_booster(model_path)
+    else:
+        from xgboost import XGBRegressor
+        from features import feature_columns, next_hour
+        train = build_features(df.head(50_000).set_index("datetime"))
+        target = next_hour(train)
+        keep = target.notna()
+        columns = feature_columns(train.columns)
+        model = XGBRegressor(n_estimators=100, max_depth=6).fit(train.loc[keep, columns], target[keep]).get_booster()
+    # app.py looks for the model next to the dataset
+    for name in (loaders.MODEL_FILE, loaders.BOOSTER_FILE, os.path.basename(loaders.booster_meta_path(loaders.BOOSTER_FILE))):
+        if os.path.exists(os.path.join(REPO, name)):
+            os.symlink(os.path.join(REPO, name), os.path.join(tmp, name))
+
+    return {
+        "dir": tmp,
+        "csv": csv,
+        "store": os.path.join(tmp, "store"),
+        "df": df.set_index("datetime"),
+        "rows": len(df),
+        "hours": hours,
+        "seed": seed,
+        "model": model,
+    }
+
+
+def compare(results, baseline_path):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+
+    def key(r):
+        return tuple((k, v) for k, v in r.items() if k not in ("repeat", "median_s", "min_s", "rows", "rows_per_s"))
+
+    before = {key(r): r for r in baseline["results"]}
+    print(f"\nvs {baseline_path} ({baseline['environment'].get('commit')}):")
+    for r in results:
+        old = before.get(key(r))
+        if old is not None:
+            label = " ".join(str(v) for _, v in key(r))
+            print(f"  {label:40s} {old['median_s'] * 1000:10.2f} ms -> {r['median_s'] * 1000:10.2f} ms"
+                  f"  ({old['median_s'] / r['median_s']:.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cities", type=int, default=20)
+    parser.add_argument("--hours", type=int, default=24 * 90, help="Hours per city")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", nargs="+", choices=CASES, help="Run only these cases")
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        t0 = time.perf_counter()
+        ctx = prepare(args.cities, args.hours, args.seed, tmp)
+        print(f"{ctx['rows']:,} synthetic rows ({args.cities} cities x {args.hours} h) in {time.perf_counter() - t0:.1f} s")
+
+        results = []
+        for case in args.only or CASES:
+            for r in globals()[f"bench_{case}"](ctx, args.repeat):
+                results.append(r)
+                extra = " ".join(f"{k}={v}" for k, v in r.items()
+                                 if k not in ("case", "repeat", "median_s", "min_s", "rows", "rows_per_s"))
+                rate = f"{r['rows_per_s']:>14,.0f} rows/s" if "rows_per_s" in r else ""
+                print(f"{case:16s} {extra:28s} {r['median_s'] * 1000:10.2f} ms {rate}")
+
+    report = {
+        "environment": environment(),
+        "config": {"cities": args.cities, "hours": args.hours, "rows": ctx["rows"], "seed": args.seed, "repeat": args.repeat},
+        "results": results,
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to {args.out}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
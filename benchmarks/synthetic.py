@@ -0,0 +1,101 @@
+"""Synthetic data shaped like air_quality_dataset.csv and the Open-Meteo responses.
+
+Everything is vectorized over (cities, hours), so millions of rows take
+seconds. The same seed always gives the same data.
+
+    python -m benchmarks.synthetic --cities 200 --hours 8760 --out synthetic.csv
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+START = "2024-01-01"
+COLUMNS = ["city", "datetime", "pm25", "pm10", "no2", "o3", "co", "temp", "humidity", "pressure", "wind_speed", "wind_dir"]
+
+
+def city_names(n):
+    """Delhi first (the pages default to it), then City001, City002, ..."""
+    return ["Delhi"] + [f"City{i:03d}" for i in range(1, n)]
+
+
+def _smooth_noise(rng, shape, window=12):
+    """Autocorrelated noise: a moving average of white noise along the hours."""
+    white = rng.standard_normal((shape[0], shape[1] + window))
+    c = np.cumsum(white, axis=1)
+    return (c[:, window:] - c[:, :-window]) / np.sqrt(window)
+
+
+def make_dataset(cities=10, hours=24 * 90, seed=0, start=START):
+    """Hourly rows for `cities` cities over `hours` hours, sorted by (city, datetime).
+
+    PM2.5 has a per-city level, a daily cycle peaking at night and
+    autocorrelated noise; the other pollutants and the weather follow it
+    loosely, so models and features see realistic structure.
+    """
+    rng = np.random.default_rng(seed)
+    shape = (cities, hours)
+    hour_of_day = (np.arange(hours) % 24)[None, :]
+    daily = np.cos(2 * np.pi * (hour_of_day - 2) / 24)  # peaks around 2 am
+
+    level = rng.gamma(4.0, 20.0, (cities, 1))
+    pm25 = np.maximum(level * (1 + 0.3 * daily) * np.exp(0.35 * _smooth_noise(rng, shape)), 1.0)
+    temp = rng.uniform(10, 30, (cities, 1)) - 5 * daily + _smooth_noise(rng, shape)
+    wind = np.maximum(rng.gamma(2.0, 2.0, shape) - 0.5 * daily, 0.0)
+
+    values = {
+        "pm25": pm25,
+        "pm10": pm25 * rng.uniform(1.0, 1.8, shape),
+        "no2": np.maximum(pm25 * 0.3 + rng.normal(0, 5, shape), 0.0),
+        "o3": np.maximum(60 - 30 * daily + rng.normal(0, 10, shape), 0.0),
+        "co": np.maximum(pm25 * 12 + rng.normal(0, 100, shape), 50.0),
+        "temp": temp,
+        "humidity": np.clip(70 + 15 * daily + 5 * _smooth_noise(rng, shape), 5, 100).round(),
+        "pressure": 1013 + 4 * _smooth_noise(rng, shape),
+        "wind_speed": wind,
+        "wind_dir": rng.integers(0, 360, shape).astype(np.float64),
+    }
+    df = pd.DataFrame({
+        "city": np.repeat(np.array(city_names(cities), dtype=object), hours),
+        "datetime": np.tile(pd.date_range(start, periods=hours, freq="h").to_numpy(), cities),
+        **{name: v.ravel().round(1) for name, v in values.items()},
+    })
+    return df[COLUMNS]
+
+
+def make_responses(hours=24 * 5, seed=0, start=START):
+    """(air-quality JSON, weather JSON) for one city, as the Open-Meteo APIs return them."""
+    df = make_dataset(1, hours, seed, start)
+    times = df["datetime"].dt.strftime("%Y-%m-%dT%H:%M").tolist()
+    aq = {"hourly": {
+        "time": times,
+        "pm2_5": df["pm25"].tolist(),
+        "pm10": df["pm10"].tolist(),
+        "nitrogen_dioxide": df["no2"].tolist(),
+        "ozone": df["o3"].tolist(),
+        "carbon_monoxide": df["co"].tolist(),
+        "uv_index": [0.0] * hours,
+        "uv_index_clear_sky": [0.0] * hours,
+    }}
+    weather = {"hourly": {
+        "time": times,
+        "temperature_2m": df["temp"].tolist(),
+        "relativehumidity_2m": df["humidity"].astype(int).tolist(),
+        "pressure_msl": df["pressure"].tolist(),
+        "windspeed_10m": df["wind_speed"].tolist(),
+        "winddirection_10m": df["wind_dir"].astype(int).tolist(),
+    }}
+    return aq, weather
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic multi-city dataset CSV")
+    parser.add_argument("--cities", type=int, default=10)
+    parser.add_argument("--hours", type=int, default=24 * 90)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="synthetic_dataset.csv")
+    args = parser.parse_args()
+
+    df = make_dataset(args.cities, args.hours, args.seed)
+    df.to_csv(args.out, index=False)
+    print(f"{len(df):,} rows for {args.cities} cities saved as {args.out}")
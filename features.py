@@ -0,0 +1,196 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+# --- Columns ---
+# Raw hourly inputs as written by the fetchers. wind_dir (degrees the wind blows
+# from) is optional: datasets fetched before it was added simply lack the wind
+# vector features.
+RAW_COLUMNS = ["pm25", "pm10", "no2", "o3", "co", "temp", "humidity", "pressure", "wind_speed"]
+OPTIONAL_COLUMNS = ["wind_dir"]
+
+LAGS = range(1, 25)  # pm25 at t-1 ... t-24
+WINDOWS = (3, 6, 12, 24)  # rolling mean/max over the last N hours, current hour included
+MAX_LAG = max(max(LAGS), max(WINDOWS) - 1)
+
+CALENDAR_COLUMNS = ["hour", "day", "weekday", "month"]
+LAG_COLUMNS = [f"pm25_lag{k}" for k in LAGS]
+ROLLING_COLUMNS = [f"pm25_{stat}{w}" for w in WINDOWS for stat in ("mean", "max")]
+WIND_COLUMNS = ["wind_u", "wind_v"]
+HOUR = np.timedelta64(1, "h")
+
+
+def feature_columns(columns):
+    """Every feature the pipeline produces for a dataset with the given raw columns."""
+    base = [c for c in RAW_COLUMNS if c in columns]
+    wind = WIND_COLUMNS if "wind_dir" in columns and "wind_speed" in columns else []
+    return base + CALENDAR_COLUMNS + LAG_COLUMNS + ROLLING_COLUMNS + wind
+
+
+def _row_features(df):
+    """Features that only need the row itself: calendar and wind vector."""
+    idx = pd.DatetimeIndex(df.index)
+    cols = {"hour": idx.hour, "day": idx.day, "weekday": idx.weekday, "month": idx.month}
+    if "wind_dir" in df.columns and "wind_speed" in df.columns:
+        rad = np.deg2rad(df["wind_dir"].to_numpy(dtype=np.float64))
+        speed = df["wind_speed"].to_numpy(dtype=np.float64)
+        # Meteorological convention: the direction the wind comes from
+        cols["wind_u"] = -speed * np.sin(rad)
+        cols["wind_v"] = -speed * np.cos(rad)
+    return pd.DataFrame(cols, index=df.index)
+
+
+def build_features(df):
+    """Batch pipeline used for training and bulk scoring.
+
+    `df` holds hourly rows indexed by datetime (optionally several cities in a
+    `city` column). Lags and rolling windows are taken on the clock, so a
+    missing hour yields NaN instead of silently shifting the series. Returns
+    a copy sorted by (city, datetime) with the feature columns added.
+    """
+    city = pd.Categorical(df["city"]).codes if "city" in df.columns else np.zeros(len(df), dtype=np.int8)
+    df = df.iloc[np.lexsort((pd.DatetimeIndex(df.index).asi8, city))]
+    groups = df.groupby("city", sort=False)["pm25"] if "city" in df.columns else [(None, df["pm25"])]
+
+    parts = []
+    for _, s in groups:
+        cols = {f"pm25_lag{k}": s.shift(k, freq="h").reindex(s.index) for k in LAGS}
+        for w in WINDOWS:
+            rolling = s.rolling(f"{w}h", min_periods=1)
+            cols[f"pm25_mean{w}"] = rolling.mean()
+            cols[f"pm25_max{w}"] = rolling.max()
+        parts.append(pd.DataFrame(cols, index=s.index))
+
+    # Cities are contiguous and in the same order as `parts`, so align by position
+    history = pd.concat(parts).set_axis(df.index)
+    out = pd.concat([df, _row_features(df), history], axis=1)
+    return out[list(df.columns) + [c for c in feature_columns(df.columns) if c not in df.columns]]
+
+
+def next_hour(df, column="pm25"):
+    """`column` one hour later on the clock, per city (NaN when that hour is missing)."""
+    if "city" not in df.columns:
+        return df[column].shift(-1, freq="h").reindex(df.index)
+    keys = pd.MultiIndex.from_arrays([df["city"], df.index])
+    ahead = pd.MultiIndex.from_arrays([df["city"], df.index + pd.Timedelta(hours=1)])
+    values = pd.Series(df[column].to_numpy(), index=keys)
+    return pd.Series(values.reindex(ahead).to_numpy(), index=df.index)
+
+
+class OnlineFeatures:
+    """Incremental version of build_features() for serving.
+
+    Keeps a ring buffer of the last MAX_LAG + 1 hourly PM2.5 values per city.
+    Each new hour updates the lags and rolling mean/max in O(window) work,
+    whatever the length of the history. Gaps are filled with NaN, exactly
+    as the batch pipeline treats missing hours.
+    """
+
+    def __init__(self):
+        self._index = {}  # city -> buffer row
+        self._buf = np.full((0, MAX_LAG + 1), np.nan)  # column 0 is the newest hour
+        self._last = np.array([], dtype="datetime64[ns]")
+
+    def _rows(self, cities):
+        new = [c for c in dict.fromkeys(cities) if c not in self._index]
+        if new:
+            for city in new:
+                self._index[city] = len(self._index)
+            self._buf = np.vstack([self._buf, np.full((len(new), MAX_LAG + 1), np.nan)])
+            self._last = np.concatenate([self._last, np.full(len(new), np.datetime64("NaT"), dtype="datetime64[ns]")])
+        return np.array([self._index[c] for c in cities], dtype=np.intp)
+
+    def last_times(self):
+        """Last hour seen per city."""
+        return {city: pd.Timestamp(self._last[row]) for city, row in self._index.items()}
+
+    def seed(self, df, city=None):
+        """Loads the last MAX_LAG + 1 hours of each city in `df` into the buffers.
+
+        Replaces any state held for those cities; no features are returned.
+        """
+        cities = df["city"].to_numpy() if "city" in df.columns else np.full(len(df), city, dtype=object)
+        times = pd.DatetimeIndex(df.index).to_numpy(dtype="datetime64[ns]")
+        last = pd.Series(times).groupby(cities).max()
+        rows = self._rows(last.index.tolist())
+
+        age = (last.to_numpy()[last.index.get_indexer(cities)] - times) // HOUR
+        keep = age <= MAX_LAG
+        buf = np.full((len(rows), MAX_LAG + 1), np.nan)
+        buf[last.index.get_indexer(cities[keep]), age[keep]] = df["pm25"].to_numpy(dtype=np.float64)[keep]
+        self._buf[rows] = buf
+        self._last[rows] = last.to_numpy()
+
+    def push(self, df, city=None):
+        """Adds one new hour for each city in `df` and returns their feature rows.
+
+        `df` is indexed by datetime with at most one row per city (a `city`
+        column, or the `city` argument for single-city frames).
+        """
+        cities = df["city"].tolist() if "city" in df.columns else [city] * len(df)
+        if len(set(cities)) != len(cities):
+            raise ValueError("push() takes at most one row per city; use update() for longer spans")
+        rows = self._rows(cities)
+        times = pd.DatetimeIndex(df.index).to_numpy(dtype="datetime64[ns]")
+
+        last = self._last[rows]
+        fresh = np.isnat(last)
+        gaps = np.where(fresh, MAX_LAG + 1, (times - np.where(fresh, times, last)) // HOUR)
+        if (gaps <= 0).any():
+            raise ValueError("hours must be pushed in chronological order")
+        gaps = np.minimum(gaps, MAX_LAG + 1)
+
+        pm25 = df["pm25"].to_numpy(dtype=np.float64)
+        for k in np.unique(gaps):
+            sel = gaps == k
+            shifted = np.full((sel.sum(), MAX_LAG + 1), np.nan)
+            shifted[:, k:] = self._buf[rows[sel], :MAX_LAG + 1 - k]
+            shifted[:, 0] = pm25[sel]
+            self._buf[rows[sel]] = shifted
+        self._last[rows] = times
+
+        buf = self._buf[rows]
+        stats = np.empty((len(rows), len(LAG_COLUMNS) + len(ROLLING_COLUMNS)))
+        stats[:, :len(LAG_COLUMNS)] = buf[:, list(LAGS)]
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN windows stay NaN
+            for i, w in enumerate(WINDOWS):
+                stats[:, len(LAG_COLUMNS) + 2 * i] = np.nanmean(buf[:, :w], axis=1)
+                stats[:, len(LAG_COLUMNS) + 2 * i + 1] = np.nanmax(buf[:, :w], axis=1)
+        history = pd.DataFrame(stats, index=df.index, columns=LAG_COLUMNS + ROLLING_COLUMNS)
+
+        out = pd.concat([df, _row_features(df), history], axis=1)
+        return out[list(df.columns) + [c for c in feature_columns(df.columns) if c not in df.columns]]
+
+    def catch_up(self, df):
+        """Brings the buffers up to date with a reloaded history; returns each updated city's newest feature row.
+
+        `df` is the whole hourly history with a `city` column. Hours at or
+        before the last one seen are ignored. A city whose only new row is the
+        next hour takes the push() path; new cities and multi-hour catch-ups
+        are re-seeded from `df` first.
+        """
+        seen = pd.Series(df["city"].to_numpy()).map(self.last_times()).to_numpy(dtype="datetime64[ns]")
+        times = pd.DatetimeIndex(df.index).to_numpy(dtype="datetime64[ns]")
+        new = df[np.isnat(seen) | (times > seen)]
+        if not len(new):
+            return new
+
+        newest = new.groupby("city", sort=False).tail(1)
+        counts = new["city"].value_counts()
+        behind = df[df["city"].isin(counts.index[counts > 1])]
+        if len(behind):
+            newest_at = behind["city"].astype(object).map(dict(zip(newest["city"], newest.index)))
+            self.seed(behind[behind.index < newest_at])
+        return self.push(newest)
+
+    def update(self, df, city=None):
+        """Pushes a span of hours (several per city allowed), oldest first.
+
+        Returns the feature rows in (hour, city) order.
+        """
+        df = df.sort_index(kind="stable")
+        keys = df["city"] if "city" in df.columns else pd.Series(city, index=df.index)
+        wave = keys.groupby(keys, sort=False).cumcount().to_numpy()
+        return pd.concat([self.push(df[wave == w], city) for w in range(wave.max() + 1)]) if len(df) else df
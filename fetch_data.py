@@ -1,27 +1,18 @@
 import requests
 import pandas as pd
-from datetime import datetime
+
+from http_client import make_session
+from providers import OpenAQ
 
 API_KEY = "YOUR_OPENWEATHER_KEY"
 city = "Delhi"
+days = 30  # OpenAQ history to page through
 
-# 1) Pollution from OpenAQ (free)
-aq_url = f"https://api.openaq.org/v2/measurements?city={city}&limit=10000"
-aq_resp = requests.get(aq_url).json()
-
-poll_records = []
-for r in aq_resp.get("results", []):
-    poll_records.append({
-        "datetime": pd.to_datetime(r["date"]["utc"]),
-        "pm25": r["value"] if r["parameter"] == "pm25" else None,
-        "pm10": r["value"] if r["parameter"] == "pm10" else None,
-        "no2": r["value"] if r["parameter"] == "no2" else None,
-        "o3": r["value"] if r["parameter"] == "o3" else None
-    })
-
-df_poll = pd.DataFrame(poll_records)
-df_poll.set_index("datetime", inplace=True)
-df_poll = df_poll.groupby("datetime").mean()    # combine duplicate timestamps
+# 1) Pollution from OpenAQ (free): paged until the last `days` days are covered,
+#    pivoted to hourly pm25/pm10/no2/o3/co columns
+today = pd.Timestamp.now("UTC").tz_localize(None).normalize()
+with make_session(pool_size=1) as session:
+    df_poll = OpenAQ().fetch(city, session, start=(today - pd.Timedelta(days=days)).date(), end=today.date())
 
 # 2) Weather forecast (5 days)
 weather_url = f"https://api.openweathermap.org/data/2.5/forecast?q={city}&appid={API_KEY}&units=metric"
@@ -29,7 +20,7 @@ weather_resp = requests.get(weather_url).json()
 
 weather_records = []
 for w in weather_resp.get("list", []):
-    dt = datetime.fromtimestamp(w["dt"])
+    dt = pd.to_datetime(w["dt"], unit="s")  # UTC, like the OpenAQ hours
     m = w["main"]
     ws = w["wind"]["speed"]
 
@@ -43,7 +34,7 @@ for w in weather_resp.get("list", []):
 
 df_weather = pd.DataFrame(weather_records)
 df_weather.set_index("datetime", inplace=True)
-df_weather = df_weather.resample("1H").interpolate()
+df_weather = df_weather.resample("1h").interpolate()
 
 # 3) Merge
 df = df_poll.join(df_weather, how="inner")
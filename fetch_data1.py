@@ -1,64 +1,288 @@
-import requests
+import argparse
+import os
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
 import pandas as pd
 
+import metrics
+import store
+from geocode_cache import CACHE_FILE, GeocodeCache, prewarm
+from hourly_json import fetch_hourly, join_hours
+from http_client import HostRateLimiter, get_json, make_session
+
 # --- Change this city name only ---
 CITY = "Delhi"
+OUTPUT_FILE = "air_quality_dataset.csv"
+
+# Open-Meteo endpoints (all free, no key needed)
+ENDPOINTS = {
+    "geo": "https://geocoding-api.open-meteo.com/v1/search",
+    "aq": "https://air-quality-api.open-meteo.com/v1/air-quality",
+    "weather": "https://api.open-meteo.com/v1/forecast",
+}
+AQ_HOURLY = "pm10,pm2_5,carbon_monoxide,nitrogen_dioxide,ozone,uv_index,uv_index_clear_sky"
+WEATHER_HOURLY = "temperature_2m,relativehumidity_2m,pressure_msl,windspeed_10m,winddirection_10m"
+FORECAST_DAYS = 5  # the air-quality API's default window: today + 4 days
+
+# Open-Meteo hourly variable -> dataset column
+AQ_COLUMNS = {"pm2_5": "pm25", "pm10": "pm10", "nitrogen_dioxide": "no2", "ozone": "o3", "carbon_monoxide": "co"}
+WEATHER_COLUMNS = {
+    "temperature_2m": "temp",
+    "relativehumidity_2m": "humidity",
+    "pressure_msl": "pressure",
+    "windspeed_10m": "wind_speed",
+    "winddirection_10m": "wind_dir",
+}
+
+
+def endpoints_for(base_url):
+    """Points every endpoint at `base_url` (e.g. a local stub server), keeping the paths."""
+    return {name: base_url.rstrip("/") + urlsplit(url).path for name, url in ENDPOINTS.items()}
+
+
+class CityNotFound(Exception):
+    pass
+
+
+def geocode(city, session, limiter=None, endpoints=ENDPOINTS, cache=None):
+    """Step 1: Get coordinates for the city (Open-Meteo geocoding).
+
+    With a GeocodeCache, the network is only hit for cities not cached yet.
+    """
+    def resolve(city):
+        geo_res = get_json(session, endpoints["geo"], {"name": city, "count": 1}, limiter)
+
+        if "results" not in geo_res or len(geo_res["results"]) == 0:
+            raise CityNotFound(f"City '{city}' not found.")
+
+        return geo_res["results"][0]["latitude"], geo_res["results"][0]["longitude"]
+
+    return resolve(city) if cache is None else cache.lookup(city, resolve)
+
+
+def to_frame(aq_data, weather_data):
+    """Merges the Open-Meteo air-quality and weather responses on the hour."""
+    # Convert AQI
+    aq_df = pd.DataFrame({
+        "datetime": aq_data["hourly"]["time"],
+        "pm25": aq_data["hourly"]["pm2_5"],
+        "pm10": aq_data["hourly"]["pm10"],
+        "no2": aq_data["hourly"]["nitrogen_dioxide"],
+        "o3": aq_data["hourly"]["ozone"],
+        "co": aq_data["hourly"]["carbon_monoxide"],
+    })
+    aq_df["datetime"] = pd.to_datetime(aq_df["datetime"])
+    aq_df.set_index("datetime", inplace=True)
+
+    # Convert weather
+    w_df = pd.DataFrame({
+        "datetime": weather_data["hourly"]["time"],
+        "temp": weather_data["hourly"]["temperature_2m"],
+        "humidity": weather_data["hourly"]["relativehumidity_2m"],
+        "pressure": weather_data["hourly"]["pressure_msl"],
+        "wind_speed": weather_data["hourly"]["windspeed_10m"],
+        "wind_dir": weather_data["hourly"]["winddirection_10m"],
+    })
+    w_df["datetime"] = pd.to_datetime(w_df["datetime"])
+    w_df.set_index("datetime", inplace=True)
+
+    # Merge both
+    return aq_df.join(w_df, how="inner")
+
+
+def hourly_frame(aq, weather):
+    """to_frame() for parsed hourly arrays (hourly_json.fetch_hourly): float32
+    columns, aligned on the integer hour."""
+    hours, (aq_rows, weather_rows) = join_hours(aq["time"], weather["time"])
+    columns = {name: aq[key][aq_rows] for key, name in AQ_COLUMNS.items()}
+    columns.update({name: weather[key][weather_rows] for key, name in WEATHER_COLUMNS.items()})
+    index = pd.DatetimeIndex(hours.astype("datetime64[h]").astype("datetime64[s]"), name="datetime")
+    return pd.DataFrame(columns, index=index, copy=False)
+
+
+def fetch_city(city, session, limiter=None, endpoints=ENDPOINTS, cache=None, start_date=None, end_date=None):
+    """Fetches the hourly air-quality + weather dataset for one city.
+
+    Without dates the APIs return their default window (recent past + forecast).
+    Responses are parsed into typed arrays while they download (hourly_json.py),
+    so long date ranges don't balloon into Python lists.
+    Each step is timed into the metrics module's stage histogram.
+    """
+    with metrics.trace("fetch_city", city=city):
+        with metrics.timed("geocode"):
+            lat, lon = geocode(city, session, limiter, endpoints, cache)
+        print(f"Fetched location: {city} -> lat:{lat}, lon:{lon}")
+
+        params = {"latitude": lat, "longitude": lon}
+        if start_date is not None:
+            params.update(start_date=str(start_date), end_date=str(end_date))
+
+        # Step 2: Fetch AQI + PM2.5 + PM10 + NO2 + O3 + Weather (100% free)
+        with metrics.timed("air_quality_api"):
+            aq = fetch_hourly(session, endpoints["aq"], AQ_COLUMNS, {**params, "hourly": AQ_HOURLY}, limiter)
+        with metrics.timed("weather_api"):
+            weather = fetch_hourly(session, endpoints["weather"], WEATHER_COLUMNS,
+                                   {**params, "hourly": WEATHER_HOURLY}, limiter)
+
+        with metrics.timed("join"):
+            return hourly_frame(aq, weather)
+
+
+def fetch_cities(cities, workers=8, rate=10, endpoints=ENDPOINTS, cache=None, since=None):
+    """Fetches many cities concurrently over one pooled session.
+
+    Requests are spread over `workers` threads and limited to `rate` requests
+    per second per host. Cities that still fail after retries are skipped.
+
+    `since` maps city -> last observed timestamp (the last stored one at or
+    before now). Those cities are only fetched from that day to the end of the
+    forecast window, and only rows newer than the timestamp are kept: they
+    replace the forecast hours stored by the previous run.
+
+    Returns one frame with `city` and `datetime` columns, sorted by both.
+    """
+    since = since or {}
+    window_end = pd.Timestamp.now("UTC").tz_localize(None).normalize() + pd.Timedelta(days=FORECAST_DAYS - 1)
+    session = make_session(pool_size=workers)
+    limiter = HostRateLimiter(rate)
+
+    def fetch_one(city):
+        last = since.get(city)
+        try:
+            if last is None:
+                return fetch_city(city, session, limiter, endpoints, cache).assign(city=city)
+            df = fetch_city(city, session, limiter, endpoints, cache, last.date(), window_end.date())
+            return df[df.index > last].assign(city=city)
+        except Exception as e:
+            print(f"Skipping {city}: {e}")
+            return None
+
+    with session, ThreadPoolExecutor(max_workers=workers) as pool:
+        frames = [f for f in pool.map(fetch_one, cities) if f is not None]
+
+    if not frames:
+        if since:
+            return pd.DataFrame(columns=["city", "datetime"])
+        raise RuntimeError("No city could be fetched.")
+
+    df = pd.concat(frames).reset_index()
+    df = df.drop_duplicates(["city", "datetime"], keep="last")
+    df = df.sort_values(["city", "datetime"])
+    return df[["city", "datetime"] + [c for c in df.columns if c not in ("city", "datetime")]]
+
+
+def last_timestamps(path, default_city=CITY, end=None):
+    """Latest stored hour (at or before `end`) per city in an existing dataset file.
+
+    Files written in single-city mode have no city column; their rows are
+    attributed to `default_city`.
+    """
+    header = pd.read_csv(path, nrows=0).columns
+    if "city" not in header:
+        df = pd.read_csv(path, usecols=["datetime"], parse_dates=["datetime"])
+        df = df if end is None else df[df["datetime"] <= end]
+        return {default_city: df["datetime"].max()} if len(df) else {}
+    df = pd.read_csv(path, usecols=["city", "datetime"], parse_dates=["datetime"])
+    df = df if end is None else df[df["datetime"] <= end]
+    return df.groupby("city")["datetime"].max().to_dict()
+
+
+def upsert_rows(df, path, default_city=CITY):
+    """Merges `df` into the CSV at `path`, keeping the existing file's columns.
+
+    Hours already in the file (the previous run's forecast window) are
+    replaced, new ones added. The file is rewritten through a temporary file.
+    """
+    if not os.path.exists(path):
+        df.to_csv(path, index=False)
+        return
+    old = pd.read_csv(path, parse_dates=["datetime"])
+    header = list(old.columns)
+    if "city" not in header:
+        old = old.assign(city=default_city)
+    merged = pd.concat([old, df], ignore_index=True).drop_duplicates(["city", "datetime"], keep="last")
+    tmp = f"{path}.tmp"
+    merged.sort_values(["city", "datetime"], kind="stable")[header].to_csv(tmp, index=False)
+    os.replace(tmp, path)
+
+
+def read_city_list(path):
+    """One city per line; blank lines and '#' comments are ignored."""
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fetch hourly air quality + weather from Open-Meteo")
+    parser.add_argument("--cities", nargs="+", help="Fetch several cities into one dataset keyed by (city, datetime)")
+    parser.add_argument("--cities-file", help="Text file with one city per line")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent requests (multi-city mode)")
+    parser.add_argument("--rate", type=float, default=10, help="Max requests per second per host")
+    parser.add_argument("--base-url", help="Send every request to this server instead (e.g. a local stub)")
+    parser.add_argument("--geocode-cache", default=CACHE_FILE, help="SQLite file caching city coordinates")
+    parser.add_argument("--geocode-ttl", type=float, help="Re-geocode cached cities older than this many seconds")
+    parser.add_argument("--no-geocode-cache", action="store_true", help="Always call the geocoding API")
+    parser.add_argument("--prewarm", action="store_true", help="Only geocode the city list into the cache, then exit")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only fetch hours after the last observed one per city, replacing stored forecast hours")
+    parser.add_argument("--out", default=OUTPUT_FILE)
+    parser.add_argument("--store", nargs="?", const=store.STORE_DIR,
+                        help=f"Upsert into the Parquet store (default dir: {store.STORE_DIR}) instead of writing --out")
+    parser.add_argument("--metrics-file", help="Write stage latency histograms here (Prometheus text format) when done")
+    parser.add_argument("--trace-log", help="Append one JSON line per fetched city with its stage timings")
+    args = parser.parse_args()
+
+    metrics.enable_trace_log(args.trace_log)
+
+    endpoints = endpoints_for(args.base_url) if args.base_url else ENDPOINTS
+    cities = (args.cities or []) + (read_city_list(args.cities_file) if args.cities_file else [])
+    cache = None if args.no_geocode_cache else GeocodeCache(args.geocode_cache, ttl=args.geocode_ttl)
+
+    if args.prewarm:
+        if cache is None:
+            parser.error("--prewarm needs the geocode cache")
+        limiter = HostRateLimiter(args.rate)
+        with make_session(pool_size=args.workers) as session:
+            failed = prewarm(cache, cities or [CITY], lambda c: geocode(c, session, limiter, endpoints), args.workers)
+        print(f"Geocode cache warmed ({len(failed)} cities failed)")
+        raise SystemExit(1 if failed else 0)
+
+    if args.incremental:
+        # Resume after the last observed hour: stored hours after now are forecasts to refresh
+        now = pd.Timestamp.now("UTC").tz_localize(None)
+        if args.store:
+            since = store.last_timestamps(args.store, end=now) if os.path.isdir(args.store) else {}
+        else:
+            since = last_timestamps(args.out, end=now) if os.path.exists(args.out) else {}
+        df = fetch_cities(cities or [CITY], workers=args.workers, rate=args.rate,
+                          endpoints=endpoints, cache=cache, since=since)
+        with metrics.timed("write"):
+            if len(df) and args.store:
+                store.write(df, args.store)
+            elif len(df):
+                upsert_rows(df, args.out)
+        print(f"Upserted {len(df)} rows (new and refreshed forecast hours) into {args.store or args.out}")
+    elif args.store:
+        df = fetch_cities(cities or [CITY], workers=args.workers, rate=args.rate, endpoints=endpoints, cache=cache)
+        with metrics.timed("write"):
+            store.write(df, args.store)
+        print(f"Dataset for {df['city'].nunique()} cities saved in {args.store}")
+    elif cities:
+        df = fetch_cities(cities, workers=args.workers, rate=args.rate, endpoints=endpoints, cache=cache)
+        with metrics.timed("write"):
+            df.to_csv(args.out, index=False)
+        print(f"Dataset for {df['city'].nunique()} cities saved as {args.out}")
+    else:
+        with make_session(pool_size=1) as session:
+            df = fetch_city(CITY, session, endpoints=endpoints, cache=cache)
+        # Save
+        with metrics.timed("write"):
+            df.to_csv(args.out)
+        print(f"Dataset saved as {args.out}")
+    print(df.head())
 
-# Step 1: Get coordinates for the city (Open-Meteo geocoding)
-geo_url = f"https://geocoding-api.open-meteo.com/v1/search?name={CITY}&count=1"
-geo_res = requests.get(geo_url).json()
-
-if "results" not in geo_res or len(geo_res["results"]) == 0:
-    raise Exception("City not found.")
-
-lat = geo_res["results"][0]["latitude"]
-lon = geo_res["results"][0]["longitude"]
-
-print(f"Fetched location: {CITY} -> lat:{lat}, lon:{lon}")
-
-# Step 2: Fetch AQI + PM2.5 + PM10 + NO2 + O3 + Weather (100% free)
-aq_url = (
-    f"https://air-quality-api.open-meteo.com/v1/air-quality?"
-    f"latitude={lat}&longitude={lon}&hourly=pm10,pm2_5,carbon_monoxide,"
-    f"nitrogen_dioxide,ozone,uv_index,uv_index_clear_sky"
-)
-
-weather_url = (
-    f"https://api.open-meteo.com/v1/forecast?"
-    f"latitude={lat}&longitude={lon}&hourly=temperature_2m,"
-    f"relativehumidity_2m,pressure_msl,windspeed_10m"
-)
-
-aq_data = requests.get(aq_url).json()
-weather_data = requests.get(weather_url).json()
-
-# Convert AQI
-aq_df = pd.DataFrame({
-    "datetime": aq_data["hourly"]["time"],
-    "pm25": aq_data["hourly"]["pm2_5"],
-    "pm10": aq_data["hourly"]["pm10"],
-    "no2": aq_data["hourly"]["nitrogen_dioxide"],
-    "o3": aq_data["hourly"]["ozone"],
-    "co": aq_data["hourly"]["carbon_monoxide"],
-})
-aq_df["datetime"] = pd.to_datetime(aq_df["datetime"])
-aq_df.set_index("datetime", inplace=True)
-
-# Convert weather
-w_df = pd.DataFrame({
-    "datetime": weather_data["hourly"]["time"],
-    "temp": weather_data["hourly"]["temperature_2m"],
-    "humidity": weather_data["hourly"]["relativehumidity_2m"],
-    "pressure": weather_data["hourly"]["pressure_msl"],
-    "wind_speed": weather_data["hourly"]["windspeed_10m"],
-})
-w_df["datetime"] = pd.to_datetime(w_df["datetime"])
-w_df.set_index("datetime", inplace=True)
-
-# Merge both
-df = aq_df.join(w_df, how="inner")
-
-# Save
-df.to_csv("air_quality_dataset.csv")
-print("Dataset saved as air_quality_dataset.csv")
-print(df.head())
+    if args.metrics_file:
+        metrics.write_text(args.metrics_file)
+        for stage, s in metrics.summary().items():
+            print(f"{stage:>16}: {s['count']:>5} x {s['mean_ms']:.1f} ms")
@@ -8,7 +8,7 @@ lat = 28.6517178
 lon = 77.2219388
 
 end = int(time.time())
-days = 5
+days = 5  # timemachine window; for longer or multi-city history use backfill.py
 
 pollution_records = []
 weather_records = []
@@ -45,13 +45,8 @@ for i in range(days):
 
     time.sleep(1)
 
-    # ...existing code...
-# limit days to allowed timemachine window
-days = min(days, 5)
-
-# ...existing code...
     # Hourly weather (timemachine)
-try:
+    try:
         tm_url = (
             f"https://api.openweathermap.org/data/3.0/onecall/timemachine"
             f"?lat={lat}&lon={lon}&dt={day_end}&appid={API_KEY}&units=metric"
@@ -73,11 +68,10 @@ try:
                 "wind_speed": hour.get("wind_speed"),
                 "pressure": hour.get("pressure")
             })
-except Exception as e:
+    except Exception as e:
         print("Weather API error:", e)
 
-time.sleep(1)
-# ...existing code...
+    time.sleep(1)
 
 # Build DataFrames
 df_poll = pd.DataFrame(pollution_records)
@@ -0,0 +1,154 @@
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from aqi import pm25_to_aqi_array
+from features import OPTIONAL_COLUMNS, RAW_COLUMNS, OnlineFeatures
+from loaders import DATASET_FILE, MODEL_FILE, as_booster, load_dataset, load_model
+
+DEFAULT_CITY = "Delhi"
+DEFAULT_HORIZON = 24
+TARGET = "pm25"
+HOUR = pd.Timedelta(hours=1)
+
+
+def _with_city(df, city):
+    """Returns `df` with a `city` column (single-city datasets don't have one)."""
+    if "city" in df.columns:
+        return df
+    return df.assign(city=city)
+
+
+def recursive_forecast(model, history, exog=None, horizon=DEFAULT_HORIZON, city=DEFAULT_CITY):
+    """Rolls the next-hour PM2.5 model forward `horizon` hours for every city.
+
+    `history` is an hourly, datetime-indexed frame; the last row of each city is
+    the forecast origin. `exog` optionally holds rows for the hours after the
+    origin (e.g. the Open-Meteo weather forecast that fetch_data1.py saves) and
+    supplies every model input except PM2.5. Inputs missing from `exog` are
+    carried forward from the previous hour.
+
+    Each horizon step is one batched predict call across all cities, with the
+    previous step's predicted PM2.5 fed back as the current PM2.5. Models
+    trained on the features.py pipeline get their lags and rolling stats
+    updated incrementally from those predictions.
+
+    Returns a long table with columns city, horizon, datetime, pm25, aqi and
+    aqi_category (code into aqi.CATEGORIES) where `datetime` is the hour being
+    forecast.
+    """
+    booster = as_booster(model)
+    features = list(booster.feature_names)
+
+    history = _with_city(history, city)
+    origin_rows = history.groupby("city", sort=True).tail(1)
+    cities = origin_rows["city"].to_numpy()
+    origins = origin_rows.index.to_numpy()
+    n = len(origin_rows)
+
+    # (cities x horizon x raw inputs) cube; slice s holds the observed/exogenous
+    # inputs of hour origin + s, which are used to predict hour origin + s + 1
+    raw = [c for c in RAW_COLUMNS + OPTIONAL_COLUMNS if c in history.columns]
+    target_idx = raw.index(TARGET)
+    R = np.full((n, horizon, len(raw)), np.nan, dtype=np.float32)
+    R[:, 0, :] = origin_rows[raw].to_numpy(dtype=np.float32)
+
+    if exog is not None and horizon > 1:
+        exog = _with_city(exog, city)
+        exog_cols = [c for c in raw if c != TARGET and c in exog.columns]
+        if exog_cols:
+            hours = origins[:, None] + np.arange(1, horizon) * HOUR
+            wanted = pd.MultiIndex.from_arrays(
+                [np.repeat(cities, horizon - 1), hours.ravel()],
+                names=["city", "datetime"],
+            )
+            exog = exog.rename_axis("datetime").set_index("city", append=True).swaplevel()
+            exog = exog[~exog.index.duplicated(keep="last")]
+            values = exog.reindex(wanted)[exog_cols].to_numpy(dtype=np.float32)
+            cols = [raw.index(c) for c in exog_cols]
+            R[:, 1:, cols] = values.reshape(n, horizon - 1, len(cols))
+
+    # Carry forward whatever the exogenous rows did not provide
+    for s in range(1, horizon):
+        step = R[:, s, :]
+        missing = np.isnan(step)
+        step[missing] = R[:, s - 1, :][missing]
+
+    # Lag/rolling/calendar features are rolled forward from each city's recent
+    # history, with every prediction pushed back in as the next hour's PM2.5
+    online = None
+    if not set(features) <= set(raw):
+        online = OnlineFeatures()
+        # Object cast: mapping a categorical city column one-to-one gives back
+        # a Categorical, which cannot be compared with the index
+        origin_of = history["city"].astype(object).map(dict(zip(cities, origins)))
+        online.seed(history[history.index < origin_of])
+        step_features = online.push(origin_rows[raw + ["city"]])
+    raw_idx = [raw.index(c) for c in features] if online is None else None
+
+    preds = np.empty((n, horizon), dtype=np.float32)
+    for s in range(horizon):
+        if s:
+            R[:, s, target_idx] = preds[:, s - 1]
+        if online is None:
+            X = R[:, s, raw_idx]
+        else:
+            if s:
+                hour = pd.DatetimeIndex(origins + s * HOUR)
+                step_features = online.push(pd.DataFrame(R[:, s], columns=raw, index=hour).assign(city=cities))
+            X = step_features[features].to_numpy(dtype=np.float32)
+        preds[:, s] = booster.inplace_predict(X)
+
+    steps = np.arange(1, horizon + 1)
+    aqi, codes = pm25_to_aqi_array(np.maximum(preds.ravel(), 0.0))
+    return pd.DataFrame({
+        "city": np.repeat(cities, horizon),
+        "horizon": np.tile(steps, n),
+        "datetime": (origins[:, None] + steps * HOUR).ravel(),
+        "pm25": preds.ravel(),
+        "aqi": aqi,
+        "aqi_category": codes,
+    })
+
+
+def current_hour():
+    """The current UTC hour, naive like the dataset's index."""
+    return pd.Timestamp.now("UTC").tz_localize(None).floor("h")
+
+
+def default_origin(df, now=None):
+    """The latest observed hour: the last row at or before `now` (default: the current UTC hour).
+
+    Rows after it are forecasts (fetch_data1.py saves the Open-Meteo forecast
+    window too) and belong in `exog`, not in the history.
+    """
+    now = current_hour() if now is None else pd.Timestamp(now)
+    past = df.index[df.index <= now]
+    return past.max() if len(past) else df.index.min()
+
+
+def split_at(df, origin):
+    """Splits a dataset into history (up to `origin`) and exogenous rows after it."""
+    origin = pd.Timestamp(origin)
+    return df[df.index <= origin], df[df.index > origin]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Multi-hour PM2.5 forecast")
+    parser.add_argument("--hours", type=int, default=DEFAULT_HORIZON)
+    parser.add_argument("--origin", help="Last observed hour, e.g. '2025-12-01 12:00'. "
+                                         "Defaults to the last row at or before the current UTC hour.")
+    parser.add_argument("--data", default=DATASET_FILE)
+    parser.add_argument("--model", default=MODEL_FILE)
+    parser.add_argument("--out", help="Optional CSV path for the horizon table")
+    args = parser.parse_args()
+
+    df = load_dataset(args.data)
+    history, exog = split_at(df, args.origin or default_origin(df))
+    table = recursive_forecast(load_model(args.model), history, exog, horizon=args.hours)
+
+    if args.out:
+        table.to_csv(args.out, index=False)
+        print(f"Forecast saved as {args.out}")
+    print(table.to_string(index=False))
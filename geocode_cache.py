@@ -0,0 +1,85 @@
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing, contextmanager
+
+CACHE_FILE = "geocode_cache.sqlite"
+
+
+def _key(city):
+    return " ".join(city.split()).casefold()
+
+
+class GeocodeCache:
+    """On-disk city -> (latitude, longitude) cache backed by SQLite.
+
+    `ttl` is in seconds; None keeps entries forever (coordinates rarely move).
+    Safe to share between threads and processes.
+    """
+
+    def __init__(self, path=CACHE_FILE, ttl=None):
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS geocode ("
+                " city TEXT PRIMARY KEY, latitude REAL NOT NULL,"
+                " longitude REAL NOT NULL, fetched_at REAL NOT NULL)"
+            )
+
+    @contextmanager
+    def _connect(self):
+        """A connection that commits (or rolls back) and is closed on exit."""
+        with closing(sqlite3.connect(self.path, timeout=30)) as conn, conn:
+            yield conn
+
+    def get(self, city):
+        """Returns cached (lat, lon) for `city`, or None if missing or expired."""
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT latitude, longitude, fetched_at FROM geocode WHERE city = ?", (_key(city),)
+            ).fetchone()
+        if row is None or (self.ttl is not None and time.time() - row[2] > self.ttl):
+            return None
+        return row[0], row[1]
+
+    def put(self, city, lat, lon):
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO geocode VALUES (?, ?, ?, ?)", (_key(city), lat, lon, time.time())
+            )
+
+    def lookup(self, city, resolve):
+        """Cached coordinates for `city`, calling `resolve(city)` and storing the result on a miss."""
+        coords = self.get(city)
+        if coords is None:
+            coords = resolve(city)
+            self.put(city, *coords)
+        return coords
+
+    def missing(self, cities):
+        """The subset of `cities` with no valid cache entry (duplicates removed)."""
+        seen = {}
+        for city in cities:
+            if _key(city) not in seen and self.get(city) is None:
+                seen[_key(city)] = city
+        return list(seen.values())
+
+
+def prewarm(cache, cities, resolve, workers=8):
+    """Resolves every uncached city concurrently and stores the results.
+
+    Returns the cities that could not be resolved.
+    """
+    def resolve_one(city):
+        try:
+            cache.put(city, *resolve(city))
+            return None
+        except Exception as e:
+            print(f"Could not geocode {city}: {e}")
+            return city
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return [c for c in pool.map(resolve_one, cache.missing(cities)) if c is not None]
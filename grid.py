@@ -0,0 +1,195 @@
+"""Nowcasts PM2.5 and AQI on a latitude/longitude grid.
+
+Open-Meteo accepts comma-separated coordinate lists, so the grid is fetched
+in chunks of CHUNK cells per request instead of one request per point. All
+cells are stacked into a (cells x hours x inputs) cube, featurized with the
+same pipeline as training (each cell is treated like a city) and scored in
+one predict call. The result is a compressed .npz whose maps are laid out
+(time, latitude, longitude) with north at row 0, so grid["aqi"][t] is an
+image and any [t, rows, cols] slice is a display tile.
+
+    python grid.py --bbox 28.40,76.84,28.88,77.35 --resolution 0.02
+"""
+import argparse
+import json
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+import metrics
+from aqi import CATEGORIES, pm25_to_aqi_array
+from features import MAX_LAG, RAW_COLUMNS, build_features
+from fetch_data1 import AQ_COLUMNS, AQ_HOURLY, ENDPOINTS, WEATHER_COLUMNS, WEATHER_HOURLY, endpoints_for
+from hourly_json import fetch_hourly_many, join_hours
+from http_client import HostRateLimiter, make_session
+from loaders import as_booster, load_model
+from registry import default_fallback
+
+GRID_FILE = "grid_nowcast.npz"
+CHUNK = 100  # coordinates per request, keeps URLs well under server limits
+PAST_DAYS = 1  # yesterday's hours give every forecast hour a full day of lags
+COLUMNS = list(AQ_COLUMNS.values()) + list(WEATHER_COLUMNS.values())
+
+
+def grid_points(south, west, north, east, resolution):
+    """Cell-centre latitudes (north to south) and longitudes (west to east)."""
+    rows = max(1, math.ceil(round((north - south) / resolution, 9)))
+    cols = max(1, math.ceil(round((east - west) / resolution, 9)))
+    lats = np.round(north - resolution * (np.arange(rows) + 0.5), 4)
+    lons = np.round(west + resolution * (np.arange(cols) + 0.5), 4)
+    return lats, lons
+
+
+def _fetch_chunk(session, limiter, endpoints, lats, lons):
+    params = {
+        "latitude": ",".join(map(str, lats)),
+        "longitude": ",".join(map(str, lons)),
+        "past_days": PAST_DAYS,
+    }
+    aq = fetch_hourly_many(session, endpoints["aq"], AQ_COLUMNS, {**params, "hourly": AQ_HOURLY}, limiter)
+    weather = fetch_hourly_many(session, endpoints["weather"], WEATHER_COLUMNS,
+                                {**params, "hourly": WEATHER_HOURLY}, limiter)
+    if len(aq) != len(lats) or len(weather) != len(lats):
+        raise ValueError(f"asked for {len(lats)} locations, got {len(aq)} air-quality and {len(weather)} weather")
+    return list(zip(aq, weather))
+
+
+def fetch_grid(lats, lons, endpoints=ENDPOINTS, chunk=CHUNK, workers=4, rate=10):
+    """Raw inputs for every cell as (first epoch hour, cube).
+
+    Cells are row-major (latitude rows, longitude columns); the cube is
+    (cells x hours x COLUMNS) float32 with NaN for hours a cell lacks.
+    """
+    cell_lats = np.repeat(lats, len(lons))
+    cell_lons = np.tile(lons, len(lats))
+    starts = range(0, len(cell_lats), chunk)
+    session = make_session(pool_size=workers)
+    limiter = HostRateLimiter(rate)
+
+    def fetch(i):
+        return _fetch_chunk(session, limiter, endpoints, cell_lats[i:i + chunk], cell_lons[i:i + chunk])
+
+    with session, ThreadPoolExecutor(max_workers=workers) as pool:
+        cells = [cell for part in pool.map(fetch, starts) for cell in part]
+
+    # Align each cell's air-quality and weather hours, then place it on a shared hour axis
+    joined = []
+    for aq, weather in cells:
+        hours, (aq_rows, weather_rows) = join_hours(aq["time"], weather["time"])
+        values = [aq[key][aq_rows] for key in AQ_COLUMNS] + [weather[key][weather_rows] for key in WEATHER_COLUMNS]
+        joined.append((hours, np.column_stack(values)))
+    spans = [hours for hours, _ in joined if len(hours)]
+    if not spans:
+        raise ValueError("no grid cell returned any hours")
+    first = min(int(hours[0]) for hours in spans)
+    last = max(int(hours[-1]) for hours in spans)
+
+    cube = np.full((len(cells), last - first + 1, len(COLUMNS)), np.nan, dtype=np.float32)
+    for i, (hours, values) in enumerate(joined):
+        cube[i, hours - first] = values
+    return first, cube
+
+
+def score_grid(booster, first, cube):
+    """PM2.5 one hour ahead for every cell and hour, as (hours kept, predictions).
+
+    The first MAX_LAG hours only serve as lag history and are dropped.
+    Cells missing an input at an hour get NaN there.
+    """
+    cells, hours, _ = cube.shape
+    times = pd.DatetimeIndex((first + np.arange(hours)).astype("datetime64[h]"), name="datetime")
+    df = pd.DataFrame(cube.reshape(-1, len(COLUMNS)), columns=COLUMNS,
+                      index=pd.DatetimeIndex(np.tile(times.to_numpy(), cells), name="datetime"))
+    df["city"] = np.repeat(np.arange(cells), hours)
+
+    with metrics.timed("grid_features"):
+        features = build_features(df)  # sorted by (cell, hour): the cube's own order
+        X = features[booster.feature_names].to_numpy(dtype=np.float32)
+    with metrics.timed("grid_predict"):
+        pred = booster.inplace_predict(X).reshape(cells, hours)
+
+    complete = ~np.isnan(cube[:, :, [COLUMNS.index(c) for c in RAW_COLUMNS]]).any(axis=2)
+    pred = np.where(complete, pred, np.nan).astype(np.float32)
+    keep = slice(MAX_LAG, None) if hours > MAX_LAG else slice(None)
+    return first + np.arange(hours)[keep], pred[:, keep]
+
+
+def write_grid(path, lats, lons, hours, cube, pred, attrs):
+    """Saves the maps as (time, latitude, longitude) arrays in a compressed .npz."""
+    shape = (len(lats), len(lons), len(hours))
+
+    def maps(a):
+        return np.ascontiguousarray(a.reshape(shape).transpose(2, 0, 1))
+
+    aqi, codes = pm25_to_aqi_array(np.maximum(pred, 0.0))
+    aqi = np.where(np.isnan(pred), np.nan, aqi)
+    codes = np.where(np.isnan(pred), -1, codes)
+    observed = cube[:, -len(hours):, COLUMNS.index("pm25")]
+    np.savez_compressed(
+        path,
+        latitude=lats,
+        longitude=lons,
+        time=hours.astype("datetime64[h]"),  # input hour; the nowcast is for time + 1 h
+        valid_time=(hours + 1).astype("datetime64[h]"),
+        pm25=maps(observed),
+        pm25_next=maps(pred),
+        aqi=maps(aqi.astype(np.float32)),
+        category=maps(codes.astype(np.int8)),
+        categories=np.array(CATEGORIES),
+        attrs=np.array(json.dumps(attrs)),
+    )
+
+
+def load_grid(path):
+    """The arrays written by write_grid(), with attrs decoded."""
+    with np.load(path) as f:
+        grid = {name: f[name] for name in f.files}
+    grid["attrs"] = json.loads(str(grid["attrs"]))
+    return grid
+
+
+def nowcast_grid(bbox, resolution, model_path=None, endpoints=ENDPOINTS, chunk=CHUNK, workers=4, rate=10, out=GRID_FILE):
+    """Fetches, scores and writes the grid over `bbox` (south, west, north, east); returns the output path."""
+    lats, lons = grid_points(*bbox, resolution)
+    model_path = model_path or default_fallback()
+    booster = as_booster(load_model(model_path))
+
+    with metrics.timed("grid_fetch"):
+        first, cube = fetch_grid(lats, lons, endpoints, chunk, workers, rate)
+    hours, pred = score_grid(booster, first, cube)
+    write_grid(out, lats, lons, hours, cube, pred, {
+        "bbox": list(bbox),
+        "resolution": resolution,
+        "model": model_path,
+        "created": pd.Timestamp.now("UTC").isoformat(),
+    })
+    return out
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Nowcast PM2.5/AQI on a lat/lon grid")
+    parser.add_argument("--bbox", required=True, help="south,west,north,east in degrees")
+    parser.add_argument("--resolution", type=float, default=0.05, help="Cell size in degrees")
+    parser.add_argument("--model", default=None, help="Model file (default: model.ubj if present, else model.pkl)")
+    parser.add_argument("--chunk", type=int, default=CHUNK, help="Coordinates per request")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent requests")
+    parser.add_argument("--rate", type=float, default=10, help="Max requests per second per host")
+    parser.add_argument("--base-url", help="Send every request to this server instead (e.g. a local stub)")
+    parser.add_argument("--out", default=GRID_FILE)
+    args = parser.parse_args()
+
+    bbox = [float(v) for v in args.bbox.split(",")]
+    if len(bbox) != 4 or bbox[0] >= bbox[2] or bbox[1] >= bbox[3]:
+        parser.error("--bbox must be south,west,north,east with south < north and west < east")
+    endpoints = endpoints_for(args.base_url) if args.base_url else ENDPOINTS
+
+    start = time.perf_counter()
+    nowcast_grid(bbox, args.resolution, args.model, endpoints, args.chunk, args.workers, args.rate, args.out)
+    grid = load_grid(args.out)
+    print(f"{len(grid['latitude'])} x {len(grid['longitude'])} cells x {len(grid['time'])} hours "
+          f"-> {args.out} in {time.perf_counter() - start:.1f} s")
+    for stage, s in metrics.summary().items():
+        print(f"{stage:>14}: {s['mean_ms']:.1f} ms")
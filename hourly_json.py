@@ -0,0 +1,190 @@
+"""Streams the `hourly` block of Open-Meteo responses straight into NumPy arrays.
+
+resp.json() turns every value into a Python float inside a list, which
+takes several times the memory of the response text and is slow to turn
+into a DataFrame. Here the body is read in chunks and each array is
+converted to a typed array (float32 values, int64 epoch hours) as soon as
+its closing bracket arrives, so at most one array's text is held at a
+time. Responses are then joined on the integer hour instead of a pandas
+datetime join.
+"""
+import json
+import re
+
+import numpy as np
+
+from http_client import get_stream
+
+CHUNK_SIZE = 1 << 16
+
+_HOURLY = re.compile(rb'"hourly"\s*:\s*\{')
+_KEY = re.compile(rb'\s*,?\s*"([^"\\]*)"\s*:\s*\[')
+_END = re.compile(rb'\s*\}')
+_MAX_KEY_BYTES = 4096  # anything longer between arrays isn't an Open-Meteo hourly block
+
+
+def _values(body, dtype=np.float32):
+    """Comma-separated JSON numbers (nulls become NaN) as a typed array."""
+    body = bytes(body).replace(b"null", b"nan")
+    if not body.strip():
+        return np.empty(0, dtype)
+    values = np.fromstring(body, dtype=dtype, sep=",")
+    if len(values) != body.count(b",") + 1:
+        raise ValueError("hourly array holds non-numeric values")
+    return values
+
+
+def _hours(body):
+    """The `time` array as int64 hours since the epoch.
+
+    Handles the default ISO strings ("2025-11-29T00:00") and timeformat=unixtime.
+    """
+    body = bytes(body).strip()
+    if not body:
+        return np.empty(0, np.int64)
+    if not body.startswith(b'"'):
+        return _values(body, np.int64) // 3600
+
+    # Compact responses have fixed-width items: view them as a byte matrix
+    width = body.find(b",") + 1 or len(body) + 1
+    if (len(body) + 1) % width == 0:
+        items = np.frombuffer(body + b",", dtype=np.uint8).reshape(-1, width)
+        if (items[:, 0] == ord('"')).all() and (items[:, -2] == ord('"')).all() and (items[:, -1] == ord(",")).all():
+            text = np.ascontiguousarray(items[:, 1:-2]).view(f"S{width - 3}").ravel()
+            return text.astype("datetime64[h]").astype(np.int64)
+    return np.array(json.loads(b"[" + body + b"]"), dtype="datetime64[h]").astype(np.int64)
+
+
+class HourlyParser:
+    """Incremental parser for the `hourly` objects of an Open-Meteo response.
+
+    feed() accepts the body in chunks of any size. Each complete `hourly`
+    object lands in `blocks` as a dict of "time" and the wanted fields;
+    other arrays are skipped unparsed. A multi-coordinate response (a JSON
+    list, one object per location) gives one block per location, in order.
+    Parsing stops after `max_blocks` blocks.
+    """
+
+    def __init__(self, fields, max_blocks=None):
+        self.fields = set(fields) | {"time"}
+        self.max_blocks = max_blocks
+        self.blocks = []
+        self.arrays = {}
+        self.done = False
+        self._buf = bytearray()
+        self._state = "seek"
+        self._key = None
+        self._scanned = 0  # bytes of the current array already searched for "]"
+
+    def feed(self, chunk):
+        self._buf += chunk
+        while not self.done:
+            if self._state == "seek":
+                m = _HOURLY.search(self._buf)
+                if m is None:
+                    del self._buf[:-32]  # keep enough for a key split across chunks
+                    return
+                del self._buf[:m.end()]
+                self._state = "key"
+            elif self._state == "key":
+                m = _END.match(self._buf)
+                if m:
+                    self.blocks.append(self.arrays)
+                    self.arrays = {}
+                    del self._buf[:m.end()]
+                    self._state = "seek"
+                    self.done = len(self.blocks) == self.max_blocks
+                    continue
+                m = _KEY.match(self._buf)
+                if m is None:
+                    if len(self._buf) > _MAX_KEY_BYTES:
+                        raise ValueError("unexpected content in the hourly block")
+                    return
+                self._key = m.group(1).decode()
+                del self._buf[:m.end()]
+                self._state, self._scanned = "array", 0
+            else:
+                end = self._buf.find(b"]", self._scanned)
+                if end < 0:
+                    self._scanned = len(self._buf)
+                    return
+                if self._key == "time":
+                    self.arrays["time"] = _hours(self._buf[:end])
+                elif self._key in self.fields:
+                    self.arrays[self._key] = _values(self._buf[:end])
+                del self._buf[:end + 1]
+                self._state = "key"
+
+
+def _checked(arrays, fields):
+    missing = fields - arrays.keys()
+    if missing:
+        raise KeyError(f"hourly block lacks {sorted(missing)}")
+    n = len(arrays["time"])
+    if any(len(a) != n for a in arrays.values()):
+        raise ValueError("hourly arrays differ in length")
+    return arrays
+
+
+def parse_hourly(chunks, fields):
+    """{"time": epoch hours, field: float32 values} from a response body given as byte chunks."""
+    parser = HourlyParser(fields, max_blocks=1)
+    for chunk in chunks:
+        parser.feed(chunk)
+        if parser.done:
+            break
+    if not parser.done:
+        raise ValueError("response has no complete 'hourly' block")
+    return _checked(parser.blocks[0], parser.fields)
+
+
+def parse_hourly_many(chunks, fields):
+    """parse_hourly() for multi-coordinate responses: one dict per location, in request order."""
+    parser = HourlyParser(fields)
+    for chunk in chunks:
+        parser.feed(chunk)
+    if parser._state != "seek":
+        raise ValueError("response ends inside an 'hourly' block")
+    return [_checked(block, parser.fields) for block in parser.blocks]
+
+
+def fetch_hourly(session, url, fields, params=None, limiter=None):
+    """GETs an Open-Meteo endpoint and parses its hourly block while it downloads."""
+    with get_stream(session, url, params, limiter) as resp:
+        return parse_hourly(resp.iter_content(CHUNK_SIZE), fields)
+
+
+def fetch_hourly_many(session, url, fields, params=None, limiter=None):
+    """fetch_hourly() for a request with comma-separated latitude/longitude lists."""
+    with get_stream(session, url, params, limiter) as resp:
+        return parse_hourly_many(resp.iter_content(CHUNK_SIZE), fields)
+
+
+def _is_hourly_run(hours):
+    return len(hours) > 0 and bool((np.diff(hours) == 1).all())
+
+
+def join_hours(*series):
+    """Inner join of several `time` arrays.
+
+    Returns (common hours, one row selector per input). Open-Meteo returns
+    runs of consecutive hours, so the selectors are usually plain slices
+    computed from the first hour of each run; anything else goes through
+    np.intersect1d.
+    """
+    if all(_is_hourly_run(h) for h in series):
+        lo = max(int(h[0]) for h in series)
+        hi = min(int(h[-1]) for h in series) + 1
+        hi = max(hi, lo)
+        return np.arange(lo, hi, dtype=np.int64), [slice(lo - int(h[0]), hi - int(h[0])) for h in series]
+
+    common = series[0]
+    for h in series[1:]:
+        common = np.intersect1d(common, h)
+    return common, [_positions(h, common) for h in series]
+
+
+def _positions(hours, common):
+    """Row of each of `common` in `hours` (first one for repeated hours)."""
+    order = np.argsort(hours, kind="stable")
+    return order[np.searchsorted(hours[order], common)]
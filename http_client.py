@@ -0,0 +1,88 @@
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_TIMEOUT = 15  # seconds, applied to connect and read
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+def make_session(pool_size=16):
+    """Returns a keep-alive session whose per-host connection pool fits `pool_size` workers."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=8, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class HostRateLimiter:
+    """Spaces out requests to each host so none receives more than `rate` per second."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def wait(self, host):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def _retry_after(resp, default):
+    try:
+        return float(resp.headers.get("Retry-After", default))
+    except ValueError:
+        return default
+
+
+def _get(session, url, params, limiter, timeout, retries, backoff, stream=False):
+    """GET with retries (see get_json()); returns the successful response."""
+    host = urlsplit(url).netloc
+    for attempt in range(retries + 1):
+        if limiter is not None:
+            limiter.wait(host)
+        delay = backoff * 2 ** attempt
+        try:
+            resp = session.get(url, params=params, timeout=timeout, stream=stream)
+        except (requests.ConnectionError, requests.Timeout):
+            if attempt == retries:
+                raise
+        else:
+            if resp.status_code not in RETRY_STATUS or attempt == retries:
+                try:
+                    resp.raise_for_status()
+                except requests.HTTPError:
+                    resp.close()
+                    raise
+                return resp
+            delay = _retry_after(resp, delay)
+            resp.close()  # hands a streamed connection back to the pool
+        time.sleep(delay)
+
+
+def get_json(session, url, params=None, limiter=None, timeout=DEFAULT_TIMEOUT, retries=3, backoff=0.5):
+    """GETs `url` and decodes the JSON body.
+
+    Connection errors, timeouts and 429/5xx responses are retried up to
+    `retries` times with exponential backoff (honouring Retry-After). Other
+    HTTP errors raise immediately.
+    """
+    return _get(session, url, params, limiter, timeout, retries, backoff).json()
+
+
+def get_stream(session, url, params=None, limiter=None, timeout=DEFAULT_TIMEOUT, retries=3, backoff=0.5):
+    """Like get_json() but returns the response with its body still unread.
+
+    Use it as a context manager and read the body with iter_content(), so
+    large responses never sit in memory whole.
+    """
+    return _get(session, url, params, limiter, timeout, retries, backoff, stream=True)
@@ -0,0 +1,237 @@
+import json
+import os
+import threading
+
+import joblib
+import pandas as pd
+
+import metrics
+import store
+from features import RAW_COLUMNS
+from schema import compact, read_dtypes
+
+MODEL_FILE = "model.pkl"
+BOOSTER_FILE = "model.ubj"  # native XGBoost format, see save_booster()
+BOOSTER_EXTENSIONS = (".ubj", ".json")
+DATASET_FILE = "air_quality_dataset.csv"
+PARAMS_FILE = "best_params.json"  # written by tune.py
+STORE_DIR = store.STORE_DIR
+
+# --- Process-wide caches ---
+# Streamlit re-runs the page script on every interaction, but imported modules
+# stay in memory, so these dicts survive reruns and are shared by all sessions.
+_lock = threading.Lock()
+_models = {}
+_datasets = {}
+_stats = {
+    "model_hits": 0,
+    "model_misses": 0,
+    "dataset_hits": 0,
+    "dataset_misses": 0,
+}
+
+
+def file_key(path):
+    """Identifies the current version of a file (by mtime and size) or Parquet store.
+
+    A store is identified by the version token store.write() leaves in it,
+    one small read however many partitions there are. Stores written before
+    that token existed fall back to statting every file.
+    """
+    if not os.path.isdir(path):
+        st = os.stat(path)
+        return st.st_mtime_ns, st.st_size
+    token = store.version(path)
+    if token is not None:
+        return token
+    mtime, size, count = 0, 0, 0
+    for dirpath, _, files in os.walk(path):
+        for name in files:
+            st = os.stat(os.path.join(dirpath, name))
+            mtime, size, count = max(mtime, st.st_mtime_ns), size + st.st_size, count + 1
+    return mtime, size, count
+
+
+def dataset_path():
+    """The Parquet store when it exists, otherwise the CSV written by the fetchers."""
+    return STORE_DIR if os.path.isdir(STORE_DIR) else DATASET_FILE
+
+
+def as_booster(model):
+    """The bare Booster behind an XGBRegressor (Boosters are returned as-is)."""
+    return model.get_booster() if hasattr(model, "get_booster") else model
+
+
+def booster_meta_path(path):
+    """Sidecar metadata file for a native model: model.ubj -> model.meta.json."""
+    return os.path.splitext(path)[0] + ".meta.json"
+
+
+def save_booster(model, path=BOOSTER_FILE, **info):
+    """Exports the model in XGBoost's native UBJSON format (or JSON for *.json).
+
+    A sidecar JSON file records the feature names and their order, so the
+    model can be served as a bare Booster without the sklearn wrapper.
+    Keyword arguments (training state such as trained_until) are stored in
+    the sidecar too.
+    """
+    import xgboost
+
+    booster = as_booster(model)
+    booster.save_model(path)
+    meta = {
+        "feature_names": booster.feature_names,
+        "feature_types": booster.feature_types,
+        "num_boosted_rounds": booster.num_boosted_rounds(),
+        "target": "pm25_next",
+        "xgboost_version": xgboost.__version__,
+        **info,
+    }
+    with open(booster_meta_path(path), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+
+
+def load_booster_meta(path=BOOSTER_FILE):
+    """The sidecar written by save_booster(), or {} when there is none."""
+    meta_path = booster_meta_path(path)
+    if not os.path.exists(meta_path):
+        return {}
+    with open(meta_path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def read_booster(path=BOOSTER_FILE):
+    """Loads a native model into a bare Booster with one read of the file (uncached)."""
+    from xgboost import Booster
+
+    with metrics.timed("model_read"), open(path, "rb") as f:
+        raw = bytearray(f.read())
+        booster = Booster()
+        booster.load_model(raw)
+
+    meta = load_booster_meta(path)
+    if meta:
+        booster.feature_names = meta["feature_names"]
+        booster.feature_types = meta["feature_types"]
+    return booster
+
+
+def load_params(default, path=PARAMS_FILE):
+    """XGBoost parameters saved by tune.py, or `default` when it hasn't been run."""
+    if not os.path.exists(path):
+        return dict(default)
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)["params"]
+
+
+def load_model(path=MODEL_FILE):
+    """Returns the model stored at `path`, loading it only once per process.
+
+    model.pkl gives the pickled XGBRegressor; a native *.ubj/*.json export
+    gives a bare Booster (see as_booster()). The model is reloaded
+    automatically if the file is replaced (e.g. after running train_model.py
+    again).
+    """
+    key = file_key(path)
+    with _lock:
+        cached = _models.get(path)
+        if cached is not None and cached[0] == key:
+            _stats["model_hits"] += 1
+            return cached[1]
+        _stats["model_misses"] += 1
+        if path.endswith(BOOSTER_EXTENSIONS):
+            model = read_booster(path)
+        else:
+            with metrics.timed("model_read"):
+                model = joblib.load(path)
+        _models[path] = (key, model)
+        return model
+
+
+def _read(path, columns, start, end, cities, last_hours):
+    if os.path.isdir(path):
+        return store.read(path, columns=columns, start=start, end=end, cities=cities, last_hours=last_hours)
+
+    # Flat CSV: no pushdown, but only the requested columns are parsed,
+    # straight into compact dtypes
+    header = pd.read_csv(path, nrows=0).columns
+    usecols = None
+    if columns is not None:
+        usecols = [c for c in header if c in ("city", "datetime") or c in columns]
+    df = pd.read_csv(path, usecols=usecols, parse_dates=["datetime"], dtype=read_dtypes(usecols or header))
+    df.set_index("datetime", inplace=True)
+    if cities is not None and "city" in df.columns:
+        df = df[df["city"].isin(list(cities))]
+    if end is not None:
+        df = df[df.index <= pd.Timestamp(end)]
+    if last_hours is not None and len(df):
+        start = df.index.max() - pd.Timedelta(hours=last_hours - 1)
+    if start is not None:
+        df = df[df.index >= pd.Timestamp(start)]
+    return df
+
+
+def load_dataset(path=None, columns=None, start=None, end=None, cities=None, last_hours=None):
+    """Returns the dataset indexed by datetime with incomplete rows dropped.
+
+    A row is incomplete when one of the raw model inputs (features.RAW_COLUMNS)
+    is missing; optional columns such as wind_dir may be NaN.
+
+    `path` is the CSV or the Parquet store (default: dataset_path()). The
+    optional arguments select columns, a time range, cities or the trailing
+    `last_hours` (counted back from the last hour at or before `end`). The
+    store pushes these down to the Parquet reader.
+
+    Columns use the compact dtypes of schema.py (float32 measurements,
+    uint8 humidity, categorical city).
+
+    The result is cached on the data's mtime, so a fresh fetch_data1.py run
+    invalidates it. The frame is shared by every caller and session: do not
+    modify it in place (with pandas copy-on-write, derived frames never
+    write through to it).
+    """
+    path = path or dataset_path()
+    query = (
+        None if columns is None else tuple(columns),
+        None if start is None else pd.Timestamp(start),
+        None if end is None else pd.Timestamp(end),
+        None if cities is None else tuple(cities),
+        last_hours,
+    )
+    key = file_key(path)
+    with _lock:
+        cached = _datasets.get((path, query))
+        if cached is not None and cached[0] == key:
+            _stats["dataset_hits"] += 1
+            return cached[1]
+        _stats["dataset_misses"] += 1
+        with metrics.timed("dataset_read"):
+            df = _read(path, columns, start, end, cities, last_hours)
+        df = compact(df.dropna(subset=[c for c in RAW_COLUMNS if c in df.columns]))
+        # Results for older versions of this dataset can never be hit again
+        for stale in [k for k, v in _datasets.items() if k[0] == path and v[0] != key]:
+            del _datasets[stale]
+        _datasets[(path, query)] = (key, df)
+        return df
+
+
+def list_cities(path=None):
+    """Cities in the dataset ([] for a single-city CSV without a city column)."""
+    path = path or dataset_path()
+    if os.path.isdir(path):
+        return store.cities(path)
+    df = load_dataset(path)
+    return sorted(df["city"].unique()) if "city" in df.columns else []
+
+
+def cache_stats():
+    """Returns a copy of the cache hit/miss counters."""
+    with _lock:
+        return dict(_stats)
+
+
+def clear_caches():
+    """Drops every cached model and dataset (counters are kept)."""
+    with _lock:
+        _models.clear()
+        _datasets.clear()
@@ -0,0 +1,164 @@
+import bisect
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Latency buckets in seconds, from in-memory cache hits to slow API calls
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """Prometheus-style histogram with one label (e.g. the stage being timed).
+
+    observe() is a bisect plus a few additions under a lock, cheap enough
+    to leave on in the hot path.
+    """
+
+    def __init__(self, name, help, label="stage", buckets=BUCKETS):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._series = {}  # label value -> [bucket counts..., sum, count]
+
+    def observe(self, value, label):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label)
+            if series is None:
+                series = self._series[label] = [0] * (len(self.buckets) + 2)
+            if i < len(self.buckets):
+                series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {label: list(series) for label, series in self._series.items()}
+
+    def exposition(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for label, series in sorted(self.snapshot().items()):
+            tag = f'{self.label}="{label}"'
+            cumulative = 0
+            for bound, n in zip(self.buckets, series):
+                cumulative += n
+                lines.append(f'{self.name}_bucket{{{tag},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{tag},le="+Inf"}} {series[-1]}')
+            lines.append(f"{self.name}_sum{{{tag}}} {series[-2]:.6f}")
+            lines.append(f"{self.name}_count{{{tag}}} {series[-1]}")
+        return "\n".join(lines)
+
+
+STAGE_SECONDS = Histogram("aqi_stage_seconds", "Time spent in each stage of fetching, loading and predicting")
+REQUEST_SECONDS = Histogram("aqi_request_seconds", "End-to-end time of traced requests", label="request")
+
+# --- Per-request traces ---
+_trace = contextvars.ContextVar("trace", default=None)
+_trace_log = None  # path of the JSON-lines trace log, see enable_trace_log()
+_trace_lock = threading.Lock()
+
+
+def enable_trace_log(path):
+    """Appends one JSON line per traced request to `path` (None turns it off)."""
+    global _trace_log
+    _trace_log = path
+
+
+@contextmanager
+def timed(stage):
+    """Times the block into STAGE_SECONDS (and the current trace, if any)."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.observe(elapsed, stage)
+        stages = _trace.get()
+        if stages is not None:
+            stages.append((stage, round(elapsed * 1000, 3)))
+
+
+@contextmanager
+def trace(request, **attrs):
+    """Groups the stages timed inside the block into one trace record.
+
+    The total goes to REQUEST_SECONDS; when a trace log is enabled the
+    per-stage breakdown is written there as well. Stages run on other
+    threads (e.g. background refreshes) are not part of the trace.
+    """
+    stages = []
+    token = _trace.set(stages)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        _trace.reset(token)
+        REQUEST_SECONDS.observe(elapsed, request)
+        if _trace_log is not None:
+            record = {
+                "ts": round(time.time(), 3),
+                "request": request,
+                **attrs,
+                "total_ms": round(elapsed * 1000, 3),
+                "stages_ms": stages,
+            }
+            with _trace_lock, open(_trace_log, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, default=str) + "\n")
+
+
+# --- Exposition ---
+def exposition():
+    """All metrics in the Prometheus text format."""
+    return "\n".join(h.exposition() for h in (STAGE_SECONDS, REQUEST_SECONDS)) + "\n"
+
+
+def write_text(path):
+    """Writes exposition() to `path` atomically (for node_exporter's textfile collector or a quick look)."""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(exposition())
+    os.replace(tmp, path)
+
+
+def summary():
+    """{stage: {"count", "mean_ms"}} for printing at the end of a CLI run."""
+    return {
+        stage: {"count": series[-1], "mean_ms": round(series[-2] / series[-1] * 1000, 2)}
+        for stage, series in sorted(STAGE_SECONDS.snapshot().items())
+        if series[-1]
+    }
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = exposition().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_http_server(port, host="127.0.0.1"):
+    """Serves GET /metrics from a daemon thread; returns the server (None if the port is taken)."""
+    try:
+        server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    except OSError as e:
+        print(f"Metrics endpoint disabled, port {port} unavailable: {e}")
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
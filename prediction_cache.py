@@ -0,0 +1,154 @@
+import hashlib
+import sqlite3
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from contextlib import closing, contextmanager
+
+import numpy as np
+
+CACHE_FILE = "prediction_cache.sqlite"
+
+_versions = weakref.WeakKeyDictionary()  # booster -> content hash
+_versions_lock = threading.Lock()
+
+
+def model_version(booster):
+    """Content hash of a Booster, computed once per loaded model.
+
+    Hashing the saved model (not the file path or mtime) means the same
+    model gets the same version in every process, so they can share the
+    on-disk cache, and a retrained model never hits stale predictions.
+    """
+    with _versions_lock:
+        version = _versions.get(booster)
+        if version is None:
+            version = hashlib.blake2b(bytes(booster.save_raw("ubj")), digest_size=12).hexdigest()
+            _versions[booster] = version
+        return version
+
+
+def row_keys(version, features, X):
+    """One key per row of X: (model version, feature names, float32 values)."""
+    prefix = (version + "|" + ",".join(features) + "|").encode()
+    return [hashlib.blake2b(prefix + row.tobytes(), digest_size=16).hexdigest() for row in X]
+
+
+class PredictionCache:
+    """Memoizes predict calls on (model version, feature row).
+
+    Keeps up to `maxsize` results in memory for at most `ttl` seconds
+    (least recently used are dropped first). With `path`, results are also
+    written to a SQLite file so several server processes share them.
+    Safe to share between threads.
+    """
+
+    def __init__(self, maxsize=4096, ttl=3600, path=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, prediction)
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if path is not None:
+            with self._connect() as conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS predictions ("
+                    " key TEXT PRIMARY KEY, value REAL NOT NULL, expires_at REAL NOT NULL)"
+                )
+
+    @contextmanager
+    def _connect(self):
+        """A connection that commits (or rolls back) and is closed on exit."""
+        with closing(sqlite3.connect(self.path, timeout=30)) as conn, conn:
+            yield conn
+
+    def _get(self, keys, now):
+        """Memory lookups, then one disk query for whatever is left."""
+        found = {}
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                if entry[0] <= now:
+                    del self._entries[key]
+                    continue
+                self._entries.move_to_end(key)
+                found[key] = entry[1]
+
+        missing = [k for k in dict.fromkeys(keys) if k not in found]
+        if self.path is not None and missing:
+            rows = []
+            with self._connect() as conn:
+                for i in range(0, len(missing), 500):  # SQLite caps the number of bound parameters
+                    chunk = missing[i:i + 500]
+                    rows += conn.execute(
+                        f"SELECT key, value, expires_at FROM predictions WHERE key IN ({','.join('?' * len(chunk))})"
+                        " AND expires_at > ?",
+                        (*chunk, now),
+                    ).fetchall()
+            with self._lock:
+                for key, value, expires_at in rows:
+                    self._store(key, value, expires_at)
+                    found[key] = value
+                self.disk_hits += len(rows)
+        return found
+
+    def _store(self, key, value, expires_at):
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def _put(self, items, now):
+        expires_at = now + self.ttl
+        with self._lock:
+            for key, value in items:
+                self._store(key, value, expires_at)
+        if self.path is not None and items:
+            with self._connect() as conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO predictions VALUES (?, ?, ?)",
+                    [(key, value, expires_at) for key, value in items],
+                )
+                conn.execute("DELETE FROM predictions WHERE expires_at <= ?", (now,))
+
+    def predict(self, booster, X):
+        """booster.inplace_predict(X), reusing cached results row by row.
+
+        X is a DataFrame or 2-D array with columns in booster.feature_names
+        order. Only rows not seen before are scored, in one predict call.
+        """
+        features = list(booster.feature_names or [])
+        X = np.ascontiguousarray(np.asarray(X, dtype=np.float32).reshape(len(X), -1))
+        keys = row_keys(model_version(booster), features, X)
+        now = time.time()
+        found = self._get(keys, now)
+
+        todo = [i for i, key in enumerate(keys) if key not in found]
+        with self._lock:
+            self.hits += len(keys) - len(todo)
+            self.misses += len(todo)
+        if todo:
+            pred = booster.inplace_predict(X[todo])
+            new = [(keys[i], float(p)) for i, p in zip(todo, np.ravel(pred))]
+            self._put(new, now)
+            found.update(new)
+        return np.array([found[key] for key in keys], dtype=np.float32)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else None,
+            }
@@ -0,0 +1,371 @@
+"""Pluggable data sources normalized to the dataset's hourly schema.
+
+Each provider fetches one API and returns a frame indexed by UTC time with
+the COLUMNS it knows, in the dataset's units, at the source's own cadence
+(OpenAQ readings arrive irregularly, OpenWeather's forecast every 3 hours).
+merge() aligns any number of them in one pass: readings are floored to the
+hour and averaged per source, each column is taken from the highest-priority
+source that has it, and short gaps left over are interpolated.
+
+Providers only talk HTTP through the session they are given. A
+FixtureSession records every response body to a directory or replays them,
+so the same code runs offline:
+
+    python providers.py --city Delhi --providers open-meteo openaq --record fixtures/
+    python providers.py --city Delhi --providers open-meteo openaq --replay fixtures/
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import numpy as np
+import pandas as pd
+import requests
+
+import metrics
+import store
+from fetch_data1 import AQ_COLUMNS, CITY, ENDPOINTS, WEATHER_COLUMNS, endpoints_for, fetch_city, geocode
+from geocode_cache import GeocodeCache
+from http_client import HostRateLimiter, get_json, make_session
+
+COLUMNS = list(AQ_COLUMNS.values()) + list(WEATHER_COLUMNS.values())
+INTERPOLATE_LIMIT = 3  # hours; bridges a 3-hourly forecast, leaves real outages as NaN
+MOLAR_MASS = {"no2": 46.01, "o3": 48.00, "co": 28.01, "so2": 64.07}  # g/mol, for ppm -> µg/m³
+SECRET_PARAMS = ("appid", "api_key")  # left out of fixture names so replays need no key
+
+
+# --- Providers ---
+class Provider:
+    """A source of hourly readings.
+
+    fetch() returns a frame indexed by naive UTC `datetime` holding a subset
+    of COLUMNS in the dataset's units (µg/m³, °C, %, hPa, km/h, degrees).
+    """
+
+    name = None
+    columns = ()
+
+    def fetch(self, city, session, limiter=None, start=None, end=None):
+        raise NotImplementedError
+
+
+class OpenMeteo(Provider):
+    """Open-Meteo air quality + weather (fetch_data1.py), already hourly and in our units."""
+
+    name = "open-meteo"
+    columns = tuple(COLUMNS)
+
+    def __init__(self, endpoints=ENDPOINTS, cache=None):
+        self.endpoints = endpoints
+        self.cache = cache
+
+    def fetch(self, city, session, limiter=None, start=None, end=None):
+        return fetch_city(city, session, limiter, self.endpoints, self.cache, start, end)
+
+
+class OpenAQ(Provider):
+    """OpenAQ station measurements (fetch_data.py).
+
+    The API returns one row per (time, parameter) reading, newest first, a
+    page at a time. pages() walks the pages until the requested range is
+    covered and keeps only three typed arrays per page; fetch() then pivots
+    every reading to hourly columns in one vectorized step.
+    """
+
+    name = "openaq"
+    columns = ("pm25", "pm10", "no2", "o3", "co")
+    url = "https://api.openaq.org/v2/measurements"
+
+    def __init__(self, url=None, limit=10000, max_pages=100):
+        self.url = url or self.url
+        self.limit = limit
+        self.max_pages = max_pages
+
+    def pages(self, city, session, limiter=None, start=None, end=None):
+        """Yields (epoch seconds, column index, value in µg/m³) arrays for each page of readings."""
+        params = {"city": city, "limit": self.limit, "order_by": "datetime", "sort": "desc"}
+        since = None
+        if start is not None:
+            since = pd.Timestamp(start)
+            params.update(date_from=since.isoformat(), date_to=(pd.Timestamp(end) + pd.Timedelta(days=1)).isoformat())
+        for page in range(1, self.max_pages + 1):
+            data = get_json(session, self.url, {**params, "page": page}, limiter)
+            results = data.get("results", [])
+            if not results:
+                return
+            oldest, readings = _openaq_readings(results, self.columns)
+            yield readings
+            found = data.get("meta", {}).get("found")  # an int, or a string like ">10000"
+            if len(results) < self.limit or (isinstance(found, int) and page * self.limit >= found):
+                return
+            if since is not None and oldest <= since.timestamp():
+                return
+        print(f"OpenAQ: stopped after {self.max_pages} pages of {self.limit}; older readings were not fetched")
+
+    def fetch(self, city, session, limiter=None, start=None, end=None):
+        pages = list(self.pages(city, session, limiter, start, end))
+        seconds, codes, values = (np.concatenate(a) for a in zip(*pages)) if pages else ([], [], [])
+        return pivot_hourly(np.asarray(seconds, dtype=np.int64), np.asarray(codes, dtype=np.int8),
+                            np.asarray(values, dtype=np.float32), self.columns)
+
+
+def _openaq_readings(results, columns):
+    """One page of OpenAQ results as (oldest epoch second, (seconds, codes, values)).
+
+    Parameters outside `columns`, missing and negative (sentinel) values are
+    dropped; ppm gases become µg/m³ = ppm * molar mass * 1000 / 24.45 (25 °C, 1 atm).
+    """
+    n = len(results)
+    seconds = pd.to_datetime([r["date"]["utc"] for r in results], utc=True, format="ISO8601").as_unit("s").asi8
+    lookup = {name: i for i, name in enumerate(columns)}
+    codes = np.fromiter((lookup.get(r["parameter"], -1) for r in results), dtype=np.int8, count=n)
+    values = np.fromiter((np.nan if r["value"] is None else r["value"] for r in results), dtype=np.float32, count=n)
+    ppm = np.fromiter((r.get("unit") == "ppm" for r in results), dtype=bool, count=n)
+
+    factor = np.array([MOLAR_MASS.get(name, np.nan) * 1000 / 24.45 for name in columns], dtype=np.float32)
+    values = np.where(ppm, values * factor[codes], values)
+    keep = (codes >= 0) & (values >= 0)  # NaN compares False
+    return seconds.min(), (seconds[keep], codes[keep], values[keep])
+
+
+def pivot_hourly(seconds, codes, values, columns):
+    """Long (epoch second, column index, value) readings -> hourly means per column.
+
+    Readings are floored to the hour and averaged with one bincount over
+    (hour, column) cells; cells without a reading are NaN.
+    """
+    hours, row = np.unique(seconds // 3600, return_inverse=True)
+    cell = row * len(columns) + codes
+    size = len(hours) * len(columns)
+    sums = np.bincount(cell, weights=values, minlength=size)
+    counts = np.bincount(cell, minlength=size)
+    with np.errstate(invalid="ignore"):
+        means = (sums / counts).astype(np.float32).reshape(len(hours), len(columns))
+    index = pd.DatetimeIndex(hours.astype("datetime64[h]").astype("datetime64[s]"), name="datetime")
+    return pd.DataFrame(means, index=index, columns=list(columns))
+
+
+class OpenWeather(Provider):
+    """OpenWeather (fetch_data.py, fetch_weather.py); needs an API key.
+
+    Without dates: the 5-day / 3-hour weather forecast. With dates: the
+    hourly air-pollution history (its weather history is one call per hour,
+    too costly to backfill with).
+    """
+
+    name = "openweather"
+    columns = ("pm25", "pm10", "no2", "o3", "co", "temp", "humidity", "pressure", "wind_speed", "wind_dir")
+    base_url = "https://api.openweathermap.org"
+
+    def __init__(self, api_key, base_url=None, endpoints=ENDPOINTS, cache=None):
+        self.api_key = api_key
+        self.base_url = (base_url or self.base_url).rstrip("/")
+        self.endpoints = endpoints
+        self.cache = cache
+
+    def fetch(self, city, session, limiter=None, start=None, end=None):
+        if not self.api_key:
+            raise ValueError("OpenWeather needs an API key")
+        lat, lon = geocode(city, session, limiter, self.endpoints, self.cache)
+        params = {"lat": lat, "lon": lon, "appid": self.api_key}
+        if start is None:
+            data = get_json(session, f"{self.base_url}/data/2.5/forecast", {**params, "units": "metric"}, limiter)
+            items = data.get("list", [])
+            return pd.DataFrame({
+                "temp": [w["main"]["temp"] for w in items],
+                "humidity": [w["main"]["humidity"] for w in items],
+                "pressure": [w["main"]["pressure"] for w in items],
+                "wind_speed": [w["wind"]["speed"] * 3.6 for w in items],  # m/s -> km/h like Open-Meteo
+                "wind_dir": [w["wind"].get("deg") for w in items],
+            }, index=_utc_index([w["dt"] for w in items]), dtype=np.float64)
+
+        first = int(pd.Timestamp(start).timestamp())
+        last = int((pd.Timestamp(end) + pd.Timedelta(days=1)).timestamp()) - 1
+        data = get_json(session, f"{self.base_url}/data/2.5/air_pollution/history",
+                        {**params, "start": first, "end": last}, limiter)
+        items = data.get("list", [])
+        names = {"pm2_5": "pm25", "pm10": "pm10", "no2": "no2", "o3": "o3", "co": "co"}
+        return pd.DataFrame({
+            column: [item["components"].get(key) for item in items] for key, column in names.items()
+        }, index=_utc_index([item["dt"] for item in items]), dtype=np.float64)
+
+
+def _utc_index(seconds):
+    return pd.DatetimeIndex(pd.to_datetime(np.asarray(seconds, dtype=np.int64), unit="s"), name="datetime")
+
+
+PROVIDERS = {cls.name: cls for cls in (OpenMeteo, OpenAQ, OpenWeather)}
+
+
+# --- Merging ---
+def _short_gaps(missing, limit):
+    """Marks NaN runs of at most `limit` rows, per column."""
+    runs = missing.ne(missing.shift()).cumsum()
+    return missing.apply(lambda col: col & (col.groupby(runs[col.name]).transform("size") <= limit))
+
+
+def merge(frames, limit=INTERPOLATE_LIMIT):
+    """Combines provider frames, highest priority first, into one hourly float32 frame.
+
+    Every reading is floored to its hour and averaged with the same source's
+    other readings in that hour; then, per column, the first source (in
+    priority order) with a value wins, so lower-priority sources only fill
+    gaps. Hours still missing are interpolated in time when the gap is at
+    most `limit` hours; longer gaps stay NaN.
+    """
+    parts = [f.reindex(columns=COLUMNS).reset_index().assign(source=rank) for rank, f in enumerate(frames) if len(f)]
+    if not parts:
+        return pd.DataFrame(columns=COLUMNS, index=pd.DatetimeIndex([], name="datetime"), dtype=np.float32)
+    combined = pd.concat(parts, ignore_index=True)
+    hour = combined.pop("datetime").dt.floor("h")
+
+    # Sorted by (hour, source), so first() picks the highest-priority non-NaN value
+    per_source = combined.groupby([hour, "source"]).mean()
+    merged = per_source.groupby(level="datetime").first()
+
+    merged = merged.reindex(pd.date_range(merged.index[0], merged.index[-1], freq="h", name="datetime"))
+    filled = merged.interpolate(method="time", limit_area="inside")
+    merged = merged.mask(_short_gaps(merged.isna(), limit), filled)
+    return merged.astype(np.float32)
+
+
+def fetch_all(providers, city, session, limiter=None, start=None, end=None, strict=False):
+    """Each provider's frame for `city`, in the given order.
+
+    A provider that fails gets an empty frame, so the merge falls back to
+    the others; with `strict` (used for fixture replays) its error is raised
+    instead. A missing fixture (FileNotFoundError) is always raised.
+    """
+    def fetch_one(provider):
+        try:
+            with metrics.timed(provider.name):
+                df = provider.fetch(city, session, limiter, start, end)
+        except FileNotFoundError:
+            raise
+        except Exception as e:
+            if strict:
+                raise
+            print(f"Skipping {provider.name}: {e}")
+            return pd.DataFrame(index=pd.DatetimeIndex([], name="datetime"))
+        if start is not None:
+            df = df[(df.index >= pd.Timestamp(start)) & (df.index < pd.Timestamp(end) + pd.Timedelta(days=1))]
+        return df
+
+    with ThreadPoolExecutor(max_workers=max(1, len(providers))) as pool:
+        return list(pool.map(fetch_one, providers))
+
+
+# --- Recorded fixtures ---
+class FixtureSession:
+    """Drop-in for a requests session that records response bodies or replays them.
+
+    mode="record" forwards every GET to `session` and saves the body of each
+    successful response under `path`; mode="replay" answers from those files
+    without touching the network (a missing fixture raises FileNotFoundError).
+    Files are named after host, path and a hash of the query, minus secrets.
+    """
+
+    def __init__(self, path, mode="replay", session=None):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"mode must be 'record' or 'replay', not {mode!r}")
+        self.path = path
+        self.mode = mode
+        self.session = session if session is not None or mode == "replay" else make_session()
+        os.makedirs(path, exist_ok=True)
+
+    def fixture_path(self, url, params=None):
+        parts = urlsplit(url)
+        query = {k: str(v) for k, v in (params or {}).items() if k not in SECRET_PARAMS}
+        digest = hashlib.sha1(json.dumps(query, sort_keys=True).encode()).hexdigest()[:12]
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", parts.netloc + parts.path).strip("_")
+        return os.path.join(self.path, f"{slug}-{digest}.json")
+
+    def get(self, url, params=None, **kwargs):
+        path = self.fixture_path(url, params)
+        if self.mode == "record":
+            resp = self.session.get(url, params=params, **kwargs)
+            if resp.status_code == 200:
+                with open(path, "wb") as f:
+                    f.write(resp.content)  # reads a streamed body; iter_content() replays it
+            return resp
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"no recorded fixture for {url} {params} ({path})")
+        resp = requests.Response()
+        resp.status_code = 200
+        resp.url = url
+        resp.headers["Content-Type"] = "application/json"
+        with open(path, "rb") as f:
+            resp._content = f.read()
+        resp._content_consumed = True  # iter_content() then slices _content instead of reading a socket
+        return resp
+
+    def close(self):
+        if self.session is not None:
+            self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def make_provider(name, endpoints=ENDPOINTS, cache=None, api_key=None, openaq_url=None, openweather_url=None):
+    if name == "open-meteo":
+        return OpenMeteo(endpoints, cache)
+    if name == "openaq":
+        return OpenAQ(openaq_url)
+    if name == "openweather":
+        return OpenWeather(api_key, openweather_url, endpoints, cache)
+    raise ValueError(f"unknown provider {name!r}; choose from {', '.join(PROVIDERS)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fetch one city from several providers and merge them by priority")
+    parser.add_argument("--city", default=CITY)
+    parser.add_argument("--providers", nargs="+", default=["open-meteo"], choices=list(PROVIDERS),
+                        help="Highest priority first; later ones only fill gaps")
+    parser.add_argument("--start", help="First day (default: each provider's recent window)")
+    parser.add_argument("--end", help="Last day (with --start)")
+    parser.add_argument("--openweather-key", help="OpenWeather API key")
+    parser.add_argument("--limit", type=int, default=INTERPOLATE_LIMIT, help="Interpolate gaps up to this many hours")
+    parser.add_argument("--rate", type=float, default=10, help="Max requests per second per host")
+    parser.add_argument("--base-url", help="Send Open-Meteo requests to this server instead (e.g. a local stub)")
+    fixtures = parser.add_mutually_exclusive_group()
+    fixtures.add_argument("--record", metavar="DIR", help="Save every response body under DIR")
+    fixtures.add_argument("--replay", metavar="DIR", help="Answer every request from bodies saved with --record")
+    parser.add_argument("--out", default="merged_dataset.csv")
+    parser.add_argument("--store", nargs="?", const=store.STORE_DIR, help="Upsert into the Parquet store instead")
+    args = parser.parse_args()
+    if (args.start is None) != (args.end is None):
+        parser.error("--start and --end go together")
+
+    endpoints = endpoints_for(args.base_url) if args.base_url else ENDPOINTS
+    # With fixtures, geocoding goes through the session too, so recordings are self-contained
+    cache = None if args.record or args.replay else GeocodeCache()
+    providers = [make_provider(name, endpoints, cache, args.openweather_key) for name in args.providers]
+
+    if args.record:
+        session = FixtureSession(args.record, "record")
+    elif args.replay:
+        session = FixtureSession(args.replay, "replay")
+    else:
+        session = make_session(pool_size=len(providers))
+    with session:
+        frames = fetch_all(providers, args.city, session, HostRateLimiter(args.rate), args.start, args.end,
+                           strict=bool(args.replay))
+
+    for provider, frame in zip(providers, frames):
+        present = [c for c in COLUMNS if c in frame.columns and frame[c].notna().any()]
+        print(f"{provider.name:>12}: {len(frame)} rows ({', '.join(present) or 'nothing'})")
+    df = merge(frames, args.limit)
+    if args.store:
+        store.write(df.reset_index().assign(city=args.city), args.store)
+        print(f"{len(df)} hours for {args.city} saved in {args.store}")
+    else:
+        df.to_csv(args.out)
+        print(f"{len(df)} hours for {args.city} saved as {args.out}")
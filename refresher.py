@@ -0,0 +1,122 @@
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class FeatureRefresher:
+    """Keeps per-city fetch results warm in the background.
+
+    `fetch(city)` is the slow call (geocoding + air-quality + weather APIs).
+    Results are served from memory while younger than `ttl`. Configured
+    cities, and any city requested in the last `idle` seconds, are refreshed
+    `refresh_ahead` seconds before they expire; a city is only watched once a
+    fetch for it succeeded, and the loop retries a failed fetch after `retry`
+    seconds rather than every poll. A result older than `ttl` but
+    younger than `max_stale` is still returned immediately while a refresh
+    runs in the background (stale-while-revalidate). Concurrent refreshes of
+    one city share a single fetch.
+    """
+
+    def __init__(self, fetch, cities=(), ttl=600, refresh_ahead=60, max_stale=3600,
+                 idle=3600, poll=15, workers=4, retry=120):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.refresh_ahead = refresh_ahead
+        self.max_stale = max_stale
+        self.idle = idle
+        self.poll = poll
+        self.retry = retry
+        self._lock = threading.Lock()
+        self._entries = {}  # city -> (fetched_at, value)
+        self._inflight = {}  # city -> Future of the running fetch
+        self._watched = {city: math.inf for city in cities}  # city -> last request time
+        self._failed = {}  # city -> time of its last failed fetch
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="refresher")
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Fetches the configured cities and starts the background loop."""
+        for city in list(self._watched):
+            self.refresh(city)
+        self._thread = threading.Thread(target=self._loop, name="refresher-loop", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def refresh(self, city):
+        """Starts a fetch for `city` unless one is already running; returns its Future."""
+        with self._lock:
+            future = self._inflight.get(city)
+            if future is None:
+                future = self._pool.submit(self._run, city)
+                self._inflight[city] = future
+            return future
+
+    def _run(self, city):
+        try:
+            value = self.fetch(city)
+            with self._lock:
+                self._entries[city] = (time.monotonic(), value)
+                self._failed.pop(city, None)
+            return value
+        except Exception as e:
+            with self._lock:
+                if city in self._watched:
+                    self._failed[city] = time.monotonic()
+            print(f"Refresh failed for {city}: {e}")
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(city, None)
+
+    def get(self, city):
+        """Latest result for `city`; only blocks when nothing usable is cached."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(city)
+
+        if entry is not None:
+            age = now - entry[0]
+            if age >= self.ttl - self.refresh_ahead and age < self.max_stale:
+                self.refresh(city)
+            if age < self.max_stale:
+                self._watch(city, now)
+                return entry[1]
+        value = self.refresh(city).result()  # raises if the fetch failed: typos are never watched
+        self._watch(city, now)
+        return value
+
+    def _watch(self, city, now):
+        with self._lock:
+            if self._watched.get(city) != math.inf:
+                self._watched[city] = now
+
+    def _loop(self):
+        while not self._stop.wait(self.poll):
+            now = time.monotonic()
+            with self._lock:
+                for city in [c for c, seen in self._watched.items() if now - seen > self.idle]:
+                    del self._watched[city]
+                    self._entries.pop(city, None)
+                    self._failed.pop(city, None)
+                due = [
+                    city for city in self._watched
+                    if (city not in self._entries or now - self._entries[city][0] >= self.ttl - self.refresh_ahead)
+                    and now - self._failed.get(city, -math.inf) >= self.retry
+                ]
+            for city in due:
+                self.refresh(city)
+
+    def stats(self):
+        """Cached cities with their age in seconds, plus in-flight fetches."""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "ages": {city: round(now - fetched_at, 1) for city, (fetched_at, _) in self._entries.items()},
+                "inflight": sorted(self._inflight),
+            }
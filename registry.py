@@ -0,0 +1,169 @@
+import argparse
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from features import build_features, feature_columns, next_hour
+from loaders import (
+    BOOSTER_FILE, MODEL_FILE, as_booster, dataset_path, file_key, load_dataset, load_model, load_params,
+    read_booster, save_booster,
+)
+
+MODELS_DIR = "models"
+INDEX_FILE = "registry.json"
+DEFAULT_CAPACITY = 32
+
+
+def default_fallback():
+    """The global model: the native export if present, else model.pkl."""
+    return BOOSTER_FILE if os.path.exists(BOOSTER_FILE) else MODEL_FILE
+
+
+def _slug(name):
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-") or "model"
+
+
+class ModelRegistry:
+    """Per-city (or per-region) models with a shared fallback.
+
+    models/registry.json maps each city to a native model file in the same
+    directory. Models are only loaded when a city is requested, and at most
+    `capacity` of them stay in memory (least recently used are dropped), so
+    memory stays flat however many cities have a model. Cities without one
+    get the fallback model, which is always kept loaded.
+    """
+
+    def __init__(self, root=MODELS_DIR, fallback=None, capacity=DEFAULT_CAPACITY):
+        self.root = root
+        self.fallback = fallback or default_fallback()
+        self.capacity = capacity
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()  # path -> (file key, booster)
+        self._index = (None, {})  # (file key of registry.json, city -> file)
+        self._fallback = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _cities(self):
+        """city -> model path, re-read when registry.json changes."""
+        path = os.path.join(self.root, INDEX_FILE)
+        if not os.path.exists(path):
+            return {}
+        key = file_key(path)
+        if self._index[0] != key:
+            with open(path, encoding="utf-8") as f:
+                entries = json.load(f)["cities"]
+            self._index = (key, {city: os.path.join(self.root, e["file"]) for city, e in entries.items()})
+        return self._index[1]
+
+    def path_for(self, city):
+        """Model file serving `city` (the fallback when it has none)."""
+        with self._lock:
+            return self._cities().get(city, self.fallback)
+
+    def get(self, city):
+        """Booster for `city`, loading it on first use."""
+        with self._lock:
+            path = self._cities().get(city)
+            own = path is not None and os.path.exists(path)
+            if own:
+                key = file_key(path)
+                cached = self._cache.get(path)
+                if cached is not None and cached[0] == key:
+                    self._cache.move_to_end(path)
+                    self.hits += 1
+                    return cached[1]
+                self.misses += 1
+        if not own:
+            return self._get_fallback()
+
+        # Read outside the lock, so a cold load doesn't stall lookups of other cities
+        booster = read_booster(path)
+        with self._lock:
+            self._cache[path] = (key, booster)
+            self._cache.move_to_end(path)
+            while len(self._cache) > self.capacity:
+                self._cache.popitem(last=False)
+                self.evictions += 1
+        return booster
+
+    def _get_fallback(self):
+        key = file_key(self.fallback)
+        if self._fallback is None or self._fallback[0] != key:
+            self._fallback = (key, as_booster(load_model(self.fallback)))
+        return self._fallback[1]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "cities_with_model": len(self._cities()),
+                "loaded": len(self._cache),
+                "capacity": self.capacity,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+def train_city_models(data_path=None, root=MODELS_DIR, regions=None, min_rows=24 * 30, params=None):
+    """Trains one model per city (or per region) and writes models/registry.json.
+
+    `regions` maps a region name to its cities; those cities share one
+    model trained on all of their rows. Groups with fewer than `min_rows`
+    training rows are left to the fallback model. Returns {group: rows}.
+    """
+    from xgboost import XGBRegressor  # training only; serving just reads native files
+
+    df = load_dataset(data_path or dataset_path())
+    if "city" not in df.columns:
+        raise ValueError("per-city models need a dataset with a city column (see fetch_data1.py --cities)")
+    df = build_features(df)
+    df["pm25_next"] = next_hour(df)
+    df = df.dropna(subset=["pm25_next"])
+    columns = feature_columns(df.columns)
+
+    group_of = {city: city for city in df["city"].unique()}
+    for region, cities in (regions or {}).items():
+        group_of.update({city: region for city in cities if city in group_of})
+    params = load_params({"n_estimators": 400, "learning_rate": 0.05, "max_depth": 10}) if params is None else params
+
+    os.makedirs(root, exist_ok=True)
+    entries, trained = {}, {}
+    for group, rows in df.groupby(df["city"].map(group_of)):
+        if len(rows) < min_rows:
+            print(f"{group}: {len(rows)} rows, using the fallback model")
+            continue
+        model = XGBRegressor(**params)
+        model.fit(rows[columns], rows["pm25_next"])
+        name = f"{_slug(group)}.ubj"
+        save_booster(model, os.path.join(root, name))
+        for city in rows["city"].unique():
+            entries[city] = {"file": name, "group": group}
+        trained[group] = len(rows)
+        print(f"{group}: trained on {len(rows)} rows -> {os.path.join(root, name)}")
+
+    # Written last and atomically, so serving never sees a half-written index
+    tmp = os.path.join(root, INDEX_FILE + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"cities": entries}, f, indent=2, sort_keys=True)
+    os.replace(tmp, os.path.join(root, INDEX_FILE))
+    return trained
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train one model per city or region")
+    parser.add_argument("--data", default=None, help="CSV file or Parquet store (default: the store if present, else the CSV)")
+    parser.add_argument("--out", default=MODELS_DIR)
+    parser.add_argument("--regions", default=None, help='JSON file like {"NCR": ["Delhi", "Noida"]}; grouped cities share a model')
+    parser.add_argument("--min-rows", type=int, default=24 * 30, help="Smaller cities/regions use the fallback model")
+    args = parser.parse_args()
+
+    regions = None
+    if args.regions:
+        with open(args.regions, encoding="utf-8") as f:
+            regions = json.load(f)
+    trained = train_city_models(args.data, args.out, regions, args.min_rows)
+    print(f"{len(trained)} models in {args.out}/ ({INDEX_FILE} maps cities to them)")
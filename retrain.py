@@ -0,0 +1,190 @@
+"""Incremental retraining: keep boosting the current model on new hours only.
+
+train_model.py refits from scratch on the whole history. retrain.py loads
+model.pkl instead and adds --trees boosting rounds fitted on the hours
+appended since it was last trained (XGBoost's xgb_model= warm start),
+reading only those hours plus the lag history they need. The model's
+sidecar (model.meta.json) records the last hour trained on and how many
+updates have been stacked since the last full fit.
+
+A full rebuild (a fresh model on all history) runs instead every
+--rebuild-every update attempts, after --max-rejected updates in a row
+were rejected, when another update would take the model past --max-trees,
+or when the sidecar has no training state yet.
+
+Either way the newest --holdout-hours are held out of training, and the
+new model only replaces model.pkl / model.ubj when its MAE there is no
+worse than the current model's (within --tolerance). Rejections are
+counted in the sidecar, so updates that keep failing end in a rebuild
+instead of warm-starting on an ever longer window of new hours.
+
+    python retrain.py           # scheduled runs: update, or rebuild when due
+    python retrain.py --full    # force a rebuild
+"""
+import argparse
+import json
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.metrics import mean_absolute_error
+from xgboost import XGBRegressor
+
+from features import MAX_LAG, build_features, feature_columns, next_hour
+from loaders import (
+    BOOSTER_FILE, MODEL_FILE, as_booster, booster_meta_path, dataset_path, load_booster_meta, load_dataset,
+    load_params, save_booster,
+)
+
+DEFAULT_PARAMS = {"n_estimators": 400, "learning_rate": 0.05, "max_depth": 10}  # same as train_model.py
+TREES_PER_UPDATE = 50
+MAX_TREES = 1000  # every tree adds inference time; past this, start over with a full fit
+REBUILD_EVERY = 30  # update attempts, promoted or not
+MAX_REJECTED = 3  # updates rejected in a row before a rebuild is forced
+HOLDOUT_HOURS = 24
+TOLERANCE = 0.02  # allowed relative MAE increase on the holdout
+MIN_TRAIN_ROWS = 24
+
+
+def training_frame(data_path, since=None):
+    """Feature rows with their pm25_next target, sorted by time.
+
+    With `since`, only rows after it are returned, and only the MAX_LAG
+    hours before it are read on top for their lag features.
+    """
+    start = None if since is None else since - pd.Timedelta(hours=MAX_LAG)
+    df = build_features(load_dataset(data_path, start=start))
+    df["pm25_next"] = next_hour(df)
+    df = df.dropna(subset=["pm25_next"]).sort_index(kind="stable")
+    return df if since is None else df[df.index > since]
+
+
+def split_holdout(df, hours=HOLDOUT_HOURS):
+    """(training rows, the newest `hours` of rows)."""
+    cutoff = df.index.max() - pd.Timedelta(hours=hours)
+    return df[df.index <= cutoff], df[df.index > cutoff]
+
+
+def holdout_mae(model, df):
+    booster = as_booster(model)
+    pred = booster.inplace_predict(df[booster.feature_names].to_numpy(dtype=np.float32))
+    return mean_absolute_error(df["pm25_next"], pred)
+
+
+def plan(meta, trees=TREES_PER_UPDATE, max_trees=MAX_TREES, rebuild_every=REBUILD_EVERY, max_rejected=MAX_REJECTED):
+    """("incremental", None) or ("full", reason) for a model with sidecar `meta`."""
+    if "trained_until" not in meta:
+        return "full", "the model has no training state yet"
+    attempts = meta.get("updates_since_rebuild", 0) + meta.get("rejected_since_rebuild", 0)
+    if attempts >= rebuild_every:
+        return "full", f"{attempts} update attempts since the last full fit"
+    if meta.get("rejected_in_a_row", 0) >= max_rejected:
+        return "full", f"the last {meta['rejected_in_a_row']} updates were rejected"
+    if meta["num_boosted_rounds"] + trees > max_trees:
+        return "full", f"{meta['num_boosted_rounds']} + {trees} trees would exceed the budget of {max_trees}"
+    return "incremental", None
+
+
+def _record(booster_path, meta, **changes):
+    """Rewrites the sidecar's training state; the model files stay as they are."""
+    path = booster_meta_path(booster_path)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({**meta, **changes}, f, indent=2)
+    os.replace(tmp, path)
+
+
+def _promote(model, model_path, booster_path, **info):
+    """Replaces the model files, each through a temporary file and os.replace."""
+    tmp = f"{model_path}.tmp"
+    joblib.dump(model, tmp)
+    os.replace(tmp, model_path)
+
+    root, ext = os.path.splitext(booster_path)
+    tmp = f"{root}.tmp{ext}"
+    save_booster(model, tmp, **info)
+    # Sidecar first: caches keyed on the model file reload once both are in place
+    os.replace(booster_meta_path(tmp), booster_meta_path(booster_path))
+    os.replace(tmp, booster_path)
+
+
+def retrain(data_path=None, full=False, trees=TREES_PER_UPDATE, max_trees=MAX_TREES, rebuild_every=REBUILD_EVERY,
+            holdout_hours=HOLDOUT_HOURS, tolerance=TOLERANCE, model_path=MODEL_FILE, booster_path=BOOSTER_FILE,
+            max_rejected=MAX_REJECTED):
+    """Updates or rebuilds the model; returns True when a new model was promoted."""
+    data_path = data_path or dataset_path()
+    meta = load_booster_meta(booster_path)
+    current = joblib.load(model_path) if os.path.exists(model_path) else None
+    mode, reason = ("full", "--full") if full else plan(meta, trees, max_trees, rebuild_every, max_rejected)
+    if mode == "incremental" and current is None:
+        mode, reason = "full", f"no {model_path} to continue from"
+
+    since = pd.Timestamp(meta["trained_until"]) if mode == "incremental" else None
+    train, holdout = split_holdout(training_frame(data_path, since), holdout_hours)
+    if len(train) < MIN_TRAIN_ROWS:
+        print(f"{len(train)} new training rows since {since}, waiting for more")
+        return False
+
+    params = load_params(DEFAULT_PARAMS)
+    if mode == "full":
+        print(f"Full rebuild on {len(train)} rows ({reason})")
+        columns = feature_columns(train.columns)
+        model = XGBRegressor(**params).fit(train[columns], train["pm25_next"])
+        updates, rejected, rebuilt_at = 0, 0, train.index.max().isoformat()
+    else:
+        booster = as_booster(current)
+        print(f"Adding {trees} trees to {booster.num_boosted_rounds()} on {len(train)} new rows after {since}")
+        model = XGBRegressor(**{**params, "n_estimators": trees})
+        model.fit(train[booster.feature_names], train["pm25_next"], xgb_model=booster)
+        updates, rejected = meta.get("updates_since_rebuild", 0) + 1, meta.get("rejected_since_rebuild", 0)
+        rebuilt_at = meta.get("rebuilt_at")
+
+    # Regression guard on the newest hours, which neither model was trained on
+    new_mae = holdout_mae(model, holdout) if len(holdout) else None
+    old_mae = holdout_mae(current, holdout) if len(holdout) and current is not None else None
+    if new_mae is None:
+        print("No holdout rows; not promoting an unchecked model")
+        return False
+    print(f"Holdout MAE ({len(holdout)} rows): new {new_mae:.3f}"
+          + ("" if old_mae is None else f", current {old_mae:.3f}"))
+    if old_mae is not None and new_mae > old_mae * (1 + tolerance):
+        print("Kept the current model")
+        if meta and mode == "full":
+            # The current model beat a fresh fit: start counting towards the next rebuild again
+            _record(booster_path, meta, updates_since_rebuild=0, rejected_since_rebuild=0, rejected_in_a_row=0)
+        elif meta:
+            _record(booster_path, meta, rejected_since_rebuild=meta.get("rejected_since_rebuild", 0) + 1,
+                    rejected_in_a_row=meta.get("rejected_in_a_row", 0) + 1)
+        return False
+
+    _promote(model, model_path, booster_path,
+             trained_until=train.index.max().isoformat(),
+             updates_since_rebuild=updates,
+             rejected_since_rebuild=rejected,
+             rejected_in_a_row=0,
+             rebuilt_at=rebuilt_at,
+             holdout_mae=float(new_mae))
+    print(f"Promoted: {as_booster(model).num_boosted_rounds()} trees -> {model_path}, {booster_path}")
+    return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Incremental (warm-start) retraining with a holdout regression guard")
+    parser.add_argument("--data", default=None, help="CSV or Parquet store (default: the store if present, else the CSV)")
+    parser.add_argument("--full", action="store_true", help="Rebuild from scratch on all history")
+    parser.add_argument("--trees", type=int, default=TREES_PER_UPDATE, help="Boosting rounds added per update")
+    parser.add_argument("--max-trees", type=int, default=MAX_TREES, help="Rebuild instead once the model would exceed this")
+    parser.add_argument("--rebuild-every", type=int, default=REBUILD_EVERY,
+                        help="Rebuild after this many update attempts (promoted or rejected)")
+    parser.add_argument("--max-rejected", type=int, default=MAX_REJECTED,
+                        help="Rebuild after this many updates in a row were rejected")
+    parser.add_argument("--holdout-hours", type=int, default=HOLDOUT_HOURS, help="Newest hours kept out of training")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="Promote if holdout MAE is at most (1 + tolerance) x the current model's")
+    parser.add_argument("--model", default=MODEL_FILE)
+    parser.add_argument("--booster", default=BOOSTER_FILE)
+    args = parser.parse_args()
+
+    retrain(args.data, args.full, args.trees, args.max_trees, args.rebuild_every,
+            args.holdout_hours, args.tolerance, args.model, args.booster, args.max_rejected)
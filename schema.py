@@ -0,0 +1,69 @@
+"""Compact in-memory dtypes for the air-quality dataset.
+
+pandas reads every measurement as float64/int64 and the city as Python
+strings. Measurements only carry one decimal, so float32 is exact enough
+(and XGBoost works in float32 anyway); humidity is a 0-100 integer; the
+city repeats on every row. compact() stores them as float32, uint8 and
+category, less than half the default size (python -m benchmarks.bench_memory).
+"""
+import numpy as np
+import pandas as pd
+
+FLOAT32_COLUMNS = ("pm25", "pm10", "no2", "o3", "co", "temp", "pressure", "wind_speed", "wind_dir")
+SMALL_INT_COLUMNS = {"humidity": np.uint8}  # percent
+CATEGORY_COLUMNS = ("city",)
+
+
+def read_dtypes(columns):
+    """dtype= for pd.read_csv, so the CSV is parsed straight into compact columns.
+
+    Small-int columns are read as float32 (they may hold blanks); compact()
+    narrows them once incomplete rows are gone.
+    """
+    dtypes = {}
+    for column in columns:
+        if column in FLOAT32_COLUMNS or column in SMALL_INT_COLUMNS:
+            dtypes[column] = np.float32
+        elif column in CATEGORY_COLUMNS:
+            dtypes[column] = "category"
+    return dtypes
+
+
+def _fits(values, dtype):
+    """True when float `values` are whole numbers within `dtype`'s range (no NaN)."""
+    info = np.iinfo(dtype)
+    values = values.to_numpy(dtype=np.float64)
+    return bool(np.all((values >= info.min) & (values <= info.max) & (values == np.round(values))))
+
+
+def compact(df):
+    """Returns `df` with the schema's dtypes; columns already compact aren't copied.
+
+    A small-int column that holds NaN or fractions stays float32. Unused
+    categories (cities filtered out) are dropped.
+    """
+    dtypes = {}
+    for column in FLOAT32_COLUMNS:
+        if column in df.columns and df[column].dtype != np.float32:
+            dtypes[column] = np.float32
+    for column, dtype in SMALL_INT_COLUMNS.items():
+        if column in df.columns and df[column].dtype != dtype:
+            dtypes[column] = dtype if _fits(df[column], dtype) else np.float32
+    for column in CATEGORY_COLUMNS:
+        if column in df.columns and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            dtypes[column] = "category"
+    if dtypes:
+        df = df.astype(dtypes)
+
+    # Categories of cities filtered out would otherwise show up as empty groups
+    unused = {
+        column: df[column].cat.remove_unused_categories()
+        for column in CATEGORY_COLUMNS
+        if column in df.columns and len(df[column].cat.categories) > df[column].nunique()
+    }
+    return df.assign(**unused) if unused else df
+
+
+def epoch_hours(index):
+    """Hours since 1970 as int32 (enough until the year 246,000) for a datetime index or column."""
+    return pd.DatetimeIndex(index).to_numpy(dtype="datetime64[h]").astype(np.int32)
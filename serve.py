@@ -0,0 +1,273 @@
+import argparse
+import json
+import queue
+import threading
+import time
+import traceback
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from aqi import CATEGORIES, INVALID, pm25_to_aqi_array
+from features import OnlineFeatures
+from forecast import DEFAULT_CITY, current_hour, recursive_forecast, split_at
+from loaders import MODEL_FILE, dataset_path, load_dataset
+from prediction_cache import PredictionCache
+from registry import DEFAULT_CAPACITY, MODELS_DIR, ModelRegistry
+
+MAX_HOURS = 72
+
+
+class UnknownCity(Exception):
+    pass
+
+
+class MicroBatcher:
+    """Groups calls that arrive within `max_wait` seconds into one `fn(items)` call.
+
+    `fn` takes a list of items and returns a list of results in the same
+    order. Callers block in submit() until their own result is ready.
+    """
+
+    def __init__(self, fn, max_wait=0.005, max_batch=512):
+        self.fn = fn
+        self.max_wait = max_wait
+        self.max_batch = max_batch
+        self.batches = 0
+        self.items = 0
+        self._queue = queue.Queue()
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    def submit(self, item):
+        future = Future()
+        self._queue.put((item, future))
+        return future.result()
+
+    def _loop(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+
+            self.batches += 1
+            self.items += len(batch)
+            try:
+                results = self.fn([item for item, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+            else:
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+
+
+class Predictor:
+    """Models + latest dataset rows, shared by every request thread.
+
+    Each city is scored with its own model from the registry when one was
+    trained (registry.py), otherwise with the global model at `model_path`.
+    Rows after the current UTC hour are the saved Open-Meteo forecast: they
+    are exogenous inputs for /forecast, never a city's latest row.
+    """
+
+    def __init__(self, model_path=MODEL_FILE, data_path=None, models_dir=MODELS_DIR, capacity=DEFAULT_CAPACITY,
+                 cache_path=None):
+        self.registry = ModelRegistry(models_dir, fallback=model_path, capacity=capacity)
+        self.cache = PredictionCache(path=cache_path)  # every client asking for a city's hour shares one score
+        self.features = list(self.registry.get(None).feature_names)  # fallback model, loaded at startup
+        self.data_path = data_path or dataset_path()
+        self._lock = threading.Lock()
+        self._online = OnlineFeatures()  # lag/rolling state, advanced as new hours arrive
+        self._data = (None, None, None, None, None)
+
+    def _current(self):
+        """(observed history, later exogenous rows, latest feature row per city), both with a city column.
+
+        Updated only when the data changes or the hour turns.
+        """
+        df = load_dataset(self.data_path)
+        hour = current_hour()
+        with self._lock:
+            if self._data[0] is not df or self._data[1] != hour:
+                history, exog = split_at(df if "city" in df.columns else df.assign(city=DEFAULT_CITY), hour)
+                fresh = self._online.catch_up(history).reset_index().set_index("city")
+                latest = self._data[4]
+                if latest is not None:
+                    fresh = pd.concat([latest.drop(fresh.index, errors="ignore"), fresh])
+                self._data = (df, hour, history, exog, fresh)
+            return self._data[2:]
+
+    def latest_row(self, city):
+        """Feature row of the most recent observed hour for `city`; UnknownCity if the city has no data."""
+        latest = self._current()[2]
+        if city not in latest.index:
+            raise UnknownCity(city)
+        return latest.loc[city]
+
+    def features_for(self, city):
+        return list(self.registry.get(city).feature_names)
+
+    def _by_model(self, cities):
+        """Groups positions in `cities` by the model file that serves them."""
+        groups = {}
+        for i, city in enumerate(cities):
+            groups.setdefault(self.registry.path_for(city), []).append(i)
+        return groups.values()
+
+    def predict_rows(self, items):
+        """One predict call per model for many (city, feature row) items.
+
+        A row is anything indexable by feature name (a Series or a dict).
+        """
+        preds = [None] * len(items)
+        for idx in self._by_model([city for city, _ in items]):
+            booster = self.registry.get(items[idx[0]][0])
+            X = np.asarray([[items[i][1][f] for f in booster.feature_names] for i in idx], dtype=np.float32)
+            for i, p in zip(idx, self.cache.predict(booster, X)):
+                preds[i] = float(p)
+        return preds
+
+    def forecast_many(self, requests):
+        """One recursive forecast per model over the union of the requested (city, hours)."""
+        history, exog, _ = self._current()
+        cities = sorted({city for city, _ in requests})
+        horizon = max(hours for _, hours in requests)
+        by_city = {}
+        for idx in self._by_model(cities):
+            group = [cities[i] for i in idx]
+            table = recursive_forecast(self.registry.get(group[0]), history[history["city"].isin(group)],
+                                       exog[exog["city"].isin(group)], horizon=horizon)
+            by_city.update({city: rows for city, rows in table.groupby("city")})
+        return [by_city[city].head(hours) for city, hours in requests]
+
+
+def _aqi_fields(pm25):
+    aqi, code = pm25_to_aqi_array(max(pm25, 0.0))
+    return {
+        "pm25": round(pm25, 2),
+        "aqi": None if np.isnan(aqi) else int(aqi),
+        "category": "N/A" if code == INVALID else CATEGORIES[code],
+    }
+
+
+def make_handler(predictor, row_batcher, forecast_batcher):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive for clients that reuse connections
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, body):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            city = params.get("city", DEFAULT_CITY)
+            try:
+                if url.path == "/predict":
+                    row = predictor.latest_row(city)
+                    pm25 = row_batcher.submit((city, row.to_dict()))
+                    hour = row["datetime"] + pd.Timedelta(hours=1)
+                    self._send(200, {"city": city, "datetime": hour.isoformat(), **_aqi_fields(pm25)})
+                elif url.path == "/forecast":
+                    try:
+                        hours = int(params.get("hours", 24))
+                    except ValueError:
+                        hours = 0
+                    if not 1 <= hours <= MAX_HOURS:
+                        return self._send(400, {"error": f"hours must be between 1 and {MAX_HOURS}"})
+                    predictor.latest_row(city)  # 404 for unknown cities
+                    table = forecast_batcher.submit((city, hours))
+                    steps = [
+                        {"horizon": int(h), "datetime": t.isoformat(), **_aqi_fields(float(p))}
+                        for h, t, p in zip(table["horizon"], table["datetime"], table["pm25"])
+                    ]
+                    self._send(200, {"city": city, "forecast": steps})
+                elif url.path == "/health":
+                    self._send(200, {
+                        "status": "ok",
+                        "predict_batches": row_batcher.batches,
+                        "predict_requests": row_batcher.items,
+                        "forecast_batches": forecast_batcher.batches,
+                        "forecast_requests": forecast_batcher.items,
+                        "models": predictor.registry.stats(),
+                        "prediction_cache": predictor.cache.stats(),
+                    })
+                else:
+                    self._send(404, {"error": "not found"})
+            except UnknownCity:
+                self._send(404, {"error": f"no data for city '{city}'"})
+            except Exception as e:
+                self._internal_error(e)
+
+        def _internal_error(self, e):
+            """Logs an unexpected failure and answers 500, so keep-alive clients still get a response."""
+            traceback.print_exc()
+            self._send(500, {"error": f"internal error: {type(e).__name__}"})
+
+        def do_POST(self):
+            """POST /predict with {"rows": [{feature: value, ...}, ...]} scores caller-supplied features.
+
+            An optional "city" picks that city's model instead of the global one.
+            """
+            if urlsplit(self.path).path != "/predict":
+                return self._send(404, {"error": "not found"})
+            features = predictor.features
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                city = body.get("city")
+                features = predictor.features_for(city)
+                rows = [(city, {f: float(r[f]) for f in features}) for r in body["rows"]]
+            except (ValueError, KeyError, TypeError, AttributeError) as e:
+                return self._send(400, {"error": f"expected {{'rows': [...]}} with features {features}: {e}"})
+            try:
+                preds = [row_batcher.submit(row) for row in rows] if len(rows) == 1 else predictor.predict_rows(rows)
+            except Exception as e:
+                return self._internal_error(e)
+            self._send(200, {"predictions": [_aqi_fields(p) for p in preds]})
+
+    return Handler
+
+
+def make_server(host="127.0.0.1", port=8000, model_path=MODEL_FILE, data_path=None, max_wait_ms=5.0,
+                models_dir=MODELS_DIR, capacity=DEFAULT_CAPACITY, cache_path=None):
+    predictor = Predictor(model_path, data_path, models_dir, capacity, cache_path)
+    row_batcher = MicroBatcher(predictor.predict_rows, max_wait=max_wait_ms / 1000)
+    forecast_batcher = MicroBatcher(predictor.forecast_many, max_wait=max_wait_ms / 1000, max_batch=64)
+    server = ThreadingHTTPServer((host, port), make_handler(predictor, row_batcher, forecast_batcher))
+    server.daemon_threads = True
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="JSON AQI prediction service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--model", default=MODEL_FILE)
+    parser.add_argument("--data", default=None, help="CSV file or Parquet store (default: the store if present, else the CSV)")
+    parser.add_argument("--models-dir", default=MODELS_DIR, help="Per-city models written by registry.py (global model for the rest)")
+    parser.add_argument("--capacity", type=int, default=DEFAULT_CAPACITY, help="Per-city models kept in memory")
+    parser.add_argument("--prediction-cache", default=None, help="SQLite file to share cached predictions between server processes")
+    parser.add_argument("--max-wait-ms", type=float, default=5.0, help="How long a request may wait for others to share its predict call")
+    args = parser.parse_args()
+
+    server = make_server(args.host, args.port, args.model, args.data, args.max_wait_ms, args.models_dir, args.capacity,
+                         args.prediction_cache)
+    print(f"Serving on http://{args.host}:{args.port} (GET /predict?city=..., /forecast?city=...&hours=24, /health)")
+    server.serve_forever()
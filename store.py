@@ -0,0 +1,189 @@
+import argparse
+import os
+import time
+from urllib.parse import unquote
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+
+STORE_DIR = "air_quality_store"
+VERSION_FILE = "_version"  # rewritten by every write(); "_" files are skipped by the Parquet reader
+DEFAULT_CITY = "Delhi"  # for single-city data without a city column
+
+# Hive layout: air_quality_store/city=Delhi/month=2025-11/part-0.parquet
+PARTITIONING = ds.partitioning(pa.schema([("city", pa.string()), ("month", pa.string())]), flavor="hive")
+
+
+def _month(ts):
+    return pd.Timestamp(ts).strftime("%Y-%m")
+
+
+def _normalize(df):
+    """Flat frame with city and datetime columns (accepts a datetime index too)."""
+    if "datetime" not in df.columns:
+        df = df.rename_axis("datetime").reset_index()
+    if "city" not in df.columns:
+        df = df.assign(city=DEFAULT_CITY)
+    df = df.assign(datetime=pd.to_datetime(df["datetime"]))
+    return df.assign(month=df["datetime"].dt.strftime("%Y-%m"))
+
+
+def _dataset(root):
+    dataset = ds.dataset(root, format="parquet", partitioning=PARTITIONING)
+    # Partitions written before a column was added (e.g. wind_dir) lack it;
+    # read the union of all file schemas so those rows get nulls instead of
+    # the column disappearing depending on which file is found first.
+    # Columns stored as float32 in some partitions and float64 in others
+    # (fetches parse to float32) are read as float64.
+    schemas = [f.physical_schema for f in dataset.get_fragments()]
+    if any(not schema.equals(schemas[0]) for schema in schemas[1:]):
+        schema = pa.unify_schemas(schemas + [PARTITIONING.schema], promote_options="permissive")
+        dataset = ds.dataset(root, schema=schema, format="parquet", partitioning=PARTITIONING)
+    return dataset
+
+
+def _filter(cities=None, start=None, end=None):
+    """Partition (city, month) plus row-group (datetime) predicates."""
+    expr = None
+
+    def both(a, b):
+        return b if a is None else a & b
+
+    if cities is not None:
+        expr = both(expr, ds.field("city").isin(list(cities)))
+    if start is not None:
+        start = pd.Timestamp(start)
+        expr = both(expr, (ds.field("month") >= _month(start)) & (ds.field("datetime") >= start.to_pydatetime()))
+    if end is not None:
+        end = pd.Timestamp(end)
+        expr = both(expr, (ds.field("month") <= _month(end)) & (ds.field("datetime") <= end.to_pydatetime()))
+    return expr
+
+
+def cities(root=STORE_DIR):
+    """Cities in the store, read from the partition directory names only."""
+    if not os.path.isdir(root):
+        return []
+    prefix = "city="
+    return sorted(unquote(e.name[len(prefix):]) for e in os.scandir(root) if e.is_dir() and e.name.startswith(prefix))
+
+
+def version(root=STORE_DIR):
+    """Token that changes with every write(), or None for a store without one (written before it existed)."""
+    try:
+        with open(os.path.join(root, VERSION_FILE), encoding="utf-8") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def _bump_version(root):
+    path = os.path.join(root, VERSION_FILE)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(f"{time.time_ns()}-{os.getpid()}")
+    os.replace(tmp, path)
+
+
+def latest_timestamp(root=STORE_DIR, cities=None, end=None):
+    """Last stored hour (at or before `end`), reading only the datetime column of the newest month."""
+    dataset = _dataset(root)
+    expr = _filter(cities, end=end)
+    months = [ds.get_partition_keys(f.partition_expression)["month"] for f in dataset.get_fragments(filter=expr)]
+    if not months:
+        return None
+    in_last_month = ds.field("month") == max(months)
+    expr = in_last_month if expr is None else expr & in_last_month
+    last = pc.max(dataset.to_table(columns=["datetime"], filter=expr).column("datetime")).as_py()
+    return None if last is None else pd.Timestamp(last)
+
+
+def read(root=STORE_DIR, columns=None, start=None, end=None, cities=None, last_hours=None):
+    """Loads a slice of the store as a datetime-indexed frame with a city column.
+
+    Only the requested `columns` are decoded, and only the partitions/row
+    groups overlapping [start, end] and `cities` are touched. `last_hours`
+    is a shortcut for start = latest stored hour (at or before `end`) - (last_hours - 1).
+    """
+    if last_hours is not None:
+        latest = latest_timestamp(root, cities, end)
+        if latest is not None:
+            start = latest - pd.Timedelta(hours=last_hours - 1)
+
+    if columns is not None:
+        columns = ["city", "datetime"] + [c for c in columns if c not in ("city", "datetime")]
+    table = _dataset(root).to_table(columns=columns, filter=_filter(cities, start, end))
+    df = table.to_pandas()
+    df = df.drop(columns="month", errors="ignore").sort_values(["city", "datetime"], kind="stable")
+    return df.set_index("datetime")
+
+
+def iter_batches(root=STORE_DIR, batch_size=100_000, columns=None, **query):
+    """Streams the store as flat frames of at most `batch_size` rows."""
+    if columns is not None:
+        columns = ["city", "datetime"] + [c for c in columns if c not in ("city", "datetime")]
+    for batch in _dataset(root).to_batches(columns=columns, filter=_filter(**query), batch_size=batch_size):
+        if batch.num_rows:
+            yield batch.to_pandas().drop(columns="month", errors="ignore")
+
+
+def write(df, root=STORE_DIR):
+    """Upserts rows into the store.
+
+    Every (city, month) partition touched by `df` is rewritten with the old
+    and new rows merged. On overlapping (city, datetime) the new row wins.
+    """
+    df = _normalize(df)
+    touched = df[["city", "month"]].drop_duplicates()
+
+    if os.path.isdir(root):
+        old = _dataset(root).to_table(
+            filter=ds.field("city").isin(touched["city"].unique().tolist())
+            & ds.field("month").isin(touched["month"].unique().tolist())
+        ).to_pandas()
+        old = old.merge(touched, on=["city", "month"])
+        df = pd.concat([old, df], ignore_index=True)
+
+    df = df.drop_duplicates(["city", "datetime"], keep="last").sort_values(["city", "datetime"])
+    ds.write_dataset(
+        pa.Table.from_pandas(df, preserve_index=False),
+        root,
+        format="parquet",
+        partitioning=PARTITIONING,
+        existing_data_behavior="delete_matching",
+        basename_template="part-{i}.parquet",
+    )
+    _bump_version(root)
+
+
+def last_timestamps(root=STORE_DIR, end=None):
+    """Latest stored hour (at or before `end`) per city (reads only the city/datetime columns)."""
+    df = read(root, columns=[], end=end)
+    return df.reset_index().groupby("city")["datetime"].max().to_dict()
+
+
+def import_csv(path, root=STORE_DIR):
+    write(pd.read_csv(path, parse_dates=["datetime"]), root)
+
+
+def export_csv(path, root=STORE_DIR, **query):
+    """Writes the store (or a slice of it) back out as a flat CSV."""
+    df = read(root, **query).reset_index()
+    df[["city", "datetime"] + [c for c in df.columns if c not in ("city", "datetime")]].to_csv(path, index=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parquet dataset store (partitioned by city and month)")
+    parser.add_argument("action", choices=["import", "export"])
+    parser.add_argument("csv", help="CSV file to import from / export to")
+    parser.add_argument("--store", default=STORE_DIR)
+    args = parser.parse_args()
+
+    if args.action == "import":
+        import_csv(args.csv, args.store)
+        print(f"Imported {args.csv} into {args.store}")
+    else:
+        export_csv(args.csv, args.store)
+        print(f"Exported {args.store} to {args.csv}")
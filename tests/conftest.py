@@ -0,0 +1,24 @@
+import pytest
+from xgboost import XGBRegressor
+
+from benchmarks.synthetic import make_dataset
+from features import build_features, feature_columns, next_hour
+from loaders import load_dataset
+
+
+@pytest.fixture
+def dataset_csv(tmp_path):
+    """A week of synthetic hourly rows for Delhi and City001."""
+    path = tmp_path / "data.csv"
+    make_dataset(cities=2, hours=24 * 7).to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.fixture
+def lag_model(dataset_csv):
+    """A small model on the features.py pipeline (lags, rolling stats, calendar)."""
+    df = build_features(load_dataset(dataset_csv))
+    df["pm25_next"] = next_hour(df)
+    df = df.dropna(subset=["pm25_next"])
+    columns = feature_columns(df.columns)
+    return XGBRegressor(n_estimators=5, max_depth=3).fit(df[columns], df["pm25_next"])
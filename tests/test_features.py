@@ -0,0 +1,12 @@
+import numpy as np
+
+from features import OnlineFeatures, build_features
+from loaders import load_dataset
+
+
+def test_single_city_catch_up(dataset_csv):
+    history = load_dataset(dataset_csv, cities=["Delhi"])
+    rows = OnlineFeatures().catch_up(history)
+    expected = build_features(history).tail(1)
+    assert rows.index.tolist() == expected.index.tolist()
+    assert np.allclose(rows["pm25_lag24"], expected["pm25_lag24"])
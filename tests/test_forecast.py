@@ -0,0 +1,20 @@
+import numpy as np
+
+from forecast import recursive_forecast
+from loaders import load_dataset
+
+
+def test_single_city_forecast(lag_model, dataset_csv):
+    # One city left in a categorical column: mapping it to its origin used to
+    # return a Categorical that could not be compared with the index
+    history = load_dataset(dataset_csv, cities=["Delhi"])
+    table = recursive_forecast(lag_model, history, horizon=3)
+    assert table["city"].tolist() == ["Delhi"] * 3
+    assert table["datetime"].tolist() == list(history.index.max() + np.arange(1, 4) * np.timedelta64(1, "h"))
+    assert table["pm25"].notna().all()
+
+
+def test_multi_city_forecast(lag_model, dataset_csv):
+    table = recursive_forecast(lag_model, load_dataset(dataset_csv), horizon=3)
+    assert sorted(table["city"].unique()) == ["City001", "Delhi"]
+    assert len(table) == 6
@@ -1,23 +1,28 @@
-import pandas as pd
 from xgboost import XGBRegressor
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_absolute_error
 import joblib
 
-df = pd.read_csv("air_quality_dataset.csv", parse_dates=["datetime"])
-df.set_index("datetime", inplace=True)
-df.dropna(inplace=True)
+from features import build_features, feature_columns, next_hour
+from loaders import BOOSTER_FILE, booster_meta_path, dataset_path, load_dataset, load_params, save_booster
 
-# Predict next hour PM2.5
-df["pm25_next"] = df["pm25"].shift(-1)
-df.dropna(inplace=True)
+# Parquet store if present, else air_quality_dataset.csv
+df = load_dataset(dataset_path())
 
-X = df.drop(columns=["pm25_next"])
+# Calendar, lag, rolling and wind features (the same pipeline serving uses)
+df = build_features(df)
+
+# Predict next hour PM2.5 (per city for multi-city datasets)
+df["pm25_next"] = next_hour(df)
+df = df.dropna(subset=["pm25_next"]).sort_index(kind="stable")  # so the test split is the most recent hours
+
+X = df[feature_columns(df.columns)]
 y = df["pm25_next"]
 
 X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.3, shuffle=False)
 
-model = XGBRegressor(n_estimators=400, learning_rate=0.05, max_depth=10)
+# Tuned parameters from tune.py when available
+model = XGBRegressor(**load_params({"n_estimators": 400, "learning_rate": 0.05, "max_depth": 10}))
 model.fit(X_train, y_train)
 
 preds = model.predict(X_test)
@@ -28,3 +33,9 @@ print("MAE:", mae)
 # Save the model
 joblib.dump(model, "model.pkl")
 print("Model saved to model.pkl")
+
+# Native booster export: loads without unpickling or the sklearn wrapper.
+# trained_until lets retrain.py continue from here on newer hours only
+save_booster(model, BOOSTER_FILE, trained_until=X_train.index.max().isoformat(), updates_since_rebuild=0,
+             rebuilt_at=X_train.index.max().isoformat())
+print(f"Booster saved to {BOOSTER_FILE} (+ {booster_meta_path(BOOSTER_FILE)})")
@@ -1,32 +1,32 @@
-import pandas as pd
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_absolute_error
 from xgboost import XGBRegressor
 
-df = pd.read_csv("delhi_air_quality.csv", parse_dates=["datetime"])
-df.set_index("datetime", inplace=True)
+from features import build_features, next_hour
+from loaders import load_dataset, load_params
 
-df["pm25_next"] = df["pm25"].shift(-1)
+df = load_dataset("delhi_air_quality.csv", columns=["pm25", "pm10", "no2", "o3"])
 
-# Time features
-df["hour"] = df.index.hour
-df["day"] = df.index.day
-df["weekday"] = df.index.weekday
+# Time features (shared pipeline)
+df = build_features(df)
 
-df.dropna(inplace=True)
+df["pm25_next"] = next_hour(df)
+
+df.dropna(subset=["pm25", "pm10", "no2", "o3", "pm25_next"], inplace=True)
 
 X = df[["pm25", "pm10", "no2", "o3", "hour", "day", "weekday"]]
 y = df["pm25_next"]
 
 X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, shuffle=False)
 
-model = XGBRegressor(
-    n_estimators=500,
-    learning_rate=0.03,
-    max_depth=7,
-    subsample=0.8,
-    colsample_bytree=0.8
-)
+# Tuned parameters from tune.py when available
+model = XGBRegressor(**load_params({
+    "n_estimators": 500,
+    "learning_rate": 0.03,
+    "max_depth": 7,
+    "subsample": 0.8,
+    "colsample_bytree": 0.8,
+}))
 
 model.fit(X_train, y_train)
 
@@ -0,0 +1,180 @@
+import argparse
+import json
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import joblib
+import numpy as np
+import pandas as pd
+from xgboost import XGBRegressor
+
+from backtest import CACHE_DIR, load_prepared, prepare, walk_forward_splits
+from loaders import BOOSTER_FILE, MODEL_FILE, PARAMS_FILE, save_booster
+
+TRIALS_FILE = "tuning_trials.csv"
+MAX_TREES = 2000  # upper bound; early stopping picks the real number
+EARLY_STOPPING_ROUNDS = 50
+
+
+def sample_configs(n, seed=0):
+    """Random configs over the parameters train_model.py and train_xgboost.py disagreed on."""
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            "max_depth": int(rng.integers(3, 11)),
+            "learning_rate": float(round(10 ** rng.uniform(-2, -0.5), 4)),
+            "subsample": float(round(rng.uniform(0.6, 1.0), 2)),
+            "colsample_bytree": float(round(rng.uniform(0.6, 1.0), 2)),
+            "min_child_weight": float(round(10 ** rng.uniform(0, 1), 2)),
+            "reg_lambda": float(round(10 ** rng.uniform(-1, 1), 3)),
+        }
+        for _ in range(n)
+    ]
+
+
+def run_trial(path, config, split, val_hours, nthread=1):
+    """Fits one config on one fold; returns (test MAE, trees kept by early stopping).
+
+    The last `val_hours` hours before the test period are the early-stopping
+    set, so validation always comes after training and before testing.
+    """
+    X, y, hours, _, _ = load_prepared(path)
+    train_start, test_start, test_end = split
+    val_start = test_start - val_hours
+    train = (hours >= train_start) & (hours < val_start)
+    val = (hours >= val_start) & (hours < test_start)
+    test = (hours >= test_start) & (hours < test_end)
+    if not train.any() or not val.any():
+        raise ValueError(f"fold {split} has no training or validation rows with val_hours={val_hours}")
+
+    model = XGBRegressor(
+        **config,
+        n_estimators=MAX_TREES,
+        early_stopping_rounds=EARLY_STOPPING_ROUNDS,
+        eval_metric="mae",
+        n_jobs=nthread,
+    )
+    model.fit(X[train], y[train], eval_set=[(X[val], y[val])], verbose=False)
+    pred = model.predict(X[test])  # uses the best iteration
+    return float(np.mean(np.abs(pred - y[test]))), model.best_iteration + 1
+
+
+def usable_splits(splits, val_hours):
+    """The folds that keep some training hours before their early-stopping window."""
+    usable = [split for split in splits if split[1] - val_hours > split[0]]
+    if not usable:
+        raise ValueError(f"not enough history for a {val_hours}-hour validation window before any test period; "
+                         "lower --val-hours, --test-hours or --folds")
+    if len(usable) < len(splits):
+        print(f"Dropped {len(splits) - len(usable)} of {len(splits)} folds without training hours before validation")
+    return usable
+
+
+def _run_trial(args):
+    return run_trial(*args)
+
+
+def successive_halving(path, configs, splits, val_hours, eta=3, workers=1, nthread=1):
+    """Scores every config on the newest fold, keeps the best 1/eta, and repeats
+    with eta times more folds until the survivors have seen all of them.
+
+    Returns (trial log rows, index of the best config, its per-fold results).
+    """
+    budgets = []
+    n = 1
+    while n < len(splits):
+        budgets.append(n)
+        n *= eta
+    budgets.append(len(splits))
+
+    results = {}  # (config, fold) -> (mae, trees); earlier rungs are reused
+    alive = list(range(len(configs)))
+    log = []
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        for rung, n_folds in enumerate(budgets):
+            folds = range(len(splits) - n_folds, len(splits))
+            todo = [(i, f) for i in alive for f in folds if (i, f) not in results]
+            tasks = [(path, configs[i], splits[f], val_hours, nthread) for i, f in todo]
+            done = pool.map(_run_trial, tasks) if pool else map(_run_trial, tasks)
+            results.update(zip(todo, done))
+
+            score = {i: np.mean([results[i, f][0] for f in folds]) for i in alive}
+            alive.sort(key=score.get)
+            for i in alive:
+                log.append({"rung": rung, "folds": n_folds, "config": i, "mae": score[i], **configs[i]})
+            print(f"rung {rung}: {len(alive)} configs x {n_folds} folds, best MAE {score[alive[0]]:.3f}")
+            if rung < len(budgets) - 1:
+                alive = alive[:max(1, len(alive) // eta)]
+    finally:
+        if pool:
+            pool.shutdown()
+
+    best = alive[0]
+    return log, best, [results[best, f] for f in range(len(splits)) if (best, f) in results]
+
+
+def tune(data_path=None, trials=27, folds=5, test_hours=24 * 7, val_hours=24 * 7, eta=3,
+         workers=None, seed=0, cache_dir=CACHE_DIR):
+    """Searches XGBoost parameters on the walk-forward folds; returns (best params, trial log).
+
+    Trials run in `workers` processes, each XGBoost fit with
+    cores // workers threads, so the machine is used fully but never
+    oversubscribed. The best params include n_estimators, taken from
+    early stopping on the best config's folds.
+    """
+    path = prepare(data_path, cache_dir)
+    _, _, hours, _, _ = load_prepared(path)
+    splits = usable_splits(walk_forward_splits(hours, folds, test_hours), val_hours)
+
+    cores = os.cpu_count() or 1
+    workers = min(workers or cores, cores, trials)
+    nthread = max(1, cores // workers)
+    configs = sample_configs(trials, seed)
+    log, best, fold_results = successive_halving(path, configs, splits, val_hours, eta, workers, nthread)
+
+    trees = int(math.ceil(np.mean([t for _, t in fold_results])))
+    params = {"n_estimators": trees, **configs[best]}
+    return params, pd.DataFrame(log)
+
+
+def fit_final(path, params):
+    """Trains on every cached row with the tuned params."""
+    X, y, _, _, meta = load_prepared(path)
+    model = XGBRegressor(**params)
+    # Named columns so the saved model carries its feature names for serving
+    model.fit(pd.DataFrame(np.asarray(X), columns=meta["features"]), np.asarray(y))
+    return model
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Tune XGBoost parameters with successive halving over walk-forward folds")
+    parser.add_argument("--data", default=None, help="CSV file or Parquet store (default: the store if present, else the CSV)")
+    parser.add_argument("--trials", type=int, default=27, help="Random configs in the first rung")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--test-hours", type=int, default=24 * 7)
+    parser.add_argument("--val-hours", type=int, default=24 * 7, help="Early-stopping window before each test period")
+    parser.add_argument("--eta", type=int, default=3, help="Keep 1/eta of the configs per rung")
+    parser.add_argument("--workers", type=int, default=None, help="Parallel trials (default: one per core)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-save-model", action="store_true", help="Only write the params, keep the current model")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    params, log = tune(args.data, args.trials, args.folds, args.test_hours, args.val_hours,
+                       args.eta, args.workers, args.seed)
+    log.to_csv(TRIALS_FILE, index=False)
+    best_mae = log[log["rung"] == log["rung"].max()]["mae"].min()
+
+    with open(PARAMS_FILE, "w", encoding="utf-8") as f:
+        json.dump({"params": params, "mae": round(float(best_mae), 4), "folds": args.folds}, f, indent=2)
+    print(f"Best params (MAE {best_mae:.3f}): {params}")
+    print(f"Saved {PARAMS_FILE} and {TRIALS_FILE} in {time.perf_counter() - start:.1f} s")
+
+    if not args.no_save_model:
+        model = fit_final(prepare(args.data), params)
+        joblib.dump(model, MODEL_FILE)
+        save_booster(model, BOOSTER_FILE)
+        print(f"Model saved to {MODEL_FILE} and {BOOSTER_FILE}")